@@ -1,8 +1,14 @@
 import heapq
-from collections import namedtuple, Mapping
+from collections import namedtuple, Mapping, OrderedDict
 from heapq import heappop, heappush
+from itertools import islice
+from math import floor, sqrt
+import time
 
-from util import INF, get_pairs, merge_dicts, flatten, RED, default_selector, apply_alpha, manhattanDistance
+import numpy as np
+
+from util import INF, get_pairs, merge_dicts, flatten, RED, default_selector, apply_alpha, manhattanDistance, \
+    euclideanDistance
 
 
 class Vertex(object):
@@ -33,10 +39,11 @@ class Vertex(object):
 
 class Edge(object):
 
-    def __init__(self, v1, v2, path):
+    def __init__(self, v1, v2, path, valid=True):
         self.v1, self.v2 = v1, v2
         self.v1.edges[v2], self.v2.edges[v1] = self, self
         self._path = path
+        self.valid = valid  # None for an edge that wasn't collision checked yet (lazy PRM)
         self._handles = []
 
     def end(self, start):
@@ -79,16 +86,324 @@ class Edge(object):
     __repr__ = __str__
 
 SearchNode = namedtuple('SearchNode', ['cost', 'parent'])
+SearchResult = namedtuple('SearchResult', ['path', 'cost', 'expanded', 'pushes', 'time'])
+
+
+class ShortestPathTree(object):
+    """
+    A single source dijkstra from a root vertex of the roadmap. since the roadmap is undirected it's also the reverse
+    tree: parent[q] is the next vertex on a shortest path from q to the root.
+    the search is resumable, it's only expanded until the vertices that were asked about are settled, so a tree that
+    is shared by several queries costs no more than a search for the farthest of them.
+    """
+
+    def __init__(self, roadmap, root):
+        self.roadmap = roadmap
+        self.root = root
+        self.dist = {root: 0}
+        self.parent = {root: None}
+        self.settled = set()
+        self.heap = [(0, root)]
+        self.expanded = 0
+
+    def __contains__(self, q):
+        return self.settle(q)
+
+    def settle(self, q):
+        """expand the search until q is settled, returns whether q is reachable from the root"""
+        while q not in self.settled and self.heap:
+            d, v = heappop(self.heap)
+            if v in self.settled:
+                continue
+            self.settled.add(v)
+            self.expanded += 1
+            self.roadmap.expanded += 1
+            for u in self.roadmap.neighbors(v):
+                cost = d + self.roadmap.distance(v, u)
+                if cost < self.dist.get(u, INF):
+                    self.dist[u] = cost
+                    self.parent[u] = v
+                    heappush(self.heap, (cost, u))
+        return q in self.settled
+
+    def next_hop(self, q):
+        """the next vertex on the way from q to the root (the root itself for the root), None if q is unreachable"""
+        if not self.settle(q):
+            return None
+        return self.parent[q] if self.parent[q] is not None else q
+
+    def path(self, q):
+        """the vertices on the way from q to the root, None if q is unreachable"""
+        if not self.settle(q):
+            return None
+        path = [q]
+        while self.parent[q] is not None:
+            q = self.parent[q]
+            path.append(q)
+        return path
+
+
+class SpatialIndex(object):
+    """
+    A uniform bucket grid over the plane that answers nearest, k-nearest and radius queries.
+    the grid is searched in square rings around the query cell, points outside of the first r rings are at least
+    r * cell_size away, so the distance function has to be at least the chebyshev distance (manhattan, euclidean).
+    every point may carry an item, the same point may be inserted more than once (with different items).
+    """
+
+    def __init__(self, cell_size=1.0, distance=manhattanDistance):
+        self.cell_size = float(cell_size)
+        self.distance = distance
+        self.buckets = {}
+        self.bounds = None  # min x, min y, max x, max y of the cells that were ever used
+        self._size = 0
+        self._counter = 0
+
+    @staticmethod
+    def cell_size_for(width, height, n, per_cell=2.0):
+        """a cell size that puts about per_cell points in each cell when n points are spread over width x height"""
+        return max(sqrt(float(width) * height * per_cell / max(n, 1)), 1e-3)
+
+    def __len__(self):
+        return self._size
+
+    def cell(self, q):
+        return int(floor(q[0] / self.cell_size)), int(floor(q[1] / self.cell_size))
+
+    def insert(self, q, item=None):
+        cx, cy = self.cell(q)
+        self.buckets.setdefault((cx, cy), []).append((q, item, self._counter))
+        self._counter += 1
+        self._size += 1
+        if self.bounds is None:
+            self.bounds = (cx, cy, cx, cy)
+        else:
+            x0, y0, x1, y1 = self.bounds
+            self.bounds = (min(x0, cx), min(y0, cy), max(x1, cx), max(y1, cy))
+
+    def remove(self, q, item=None):
+        """removes the oldest entry of q (with the given item if there is one), returns whether it was found"""
+        c = self.cell(q)
+        bucket = self.buckets.get(c, [])
+        for i, (p, p_item, _) in enumerate(bucket):
+            if p == q and (item is None or p_item == item):
+                del bucket[i]
+                if not bucket:
+                    del self.buckets[c]
+                self._size -= 1
+                return True
+        return False
+
+    def clear(self):
+        self.buckets = {}
+        self.bounds = None
+        self._size = 0
+
+    def _ring(self, cx, cy, r):
+        if r == 0:
+            yield cx, cy
+            return
+        for x in range(cx - r, cx + r + 1):
+            yield x, cy - r
+            yield x, cy + r
+        for y in range(cy - r + 1, cy + r):
+            yield cx - r, y
+            yield cx + r, y
+
+    def iter_nearest(self, q, newest_first=False):
+        """
+        yields (distance, point, item) in increasing distance from q, lazily so stopping early is cheap.
+        ties are broken by insertion order, oldest first unless newest_first
+        """
+        if self.bounds is None:
+            return
+        cx, cy = self.cell(q)
+        x0, y0, x1, y1 = self.bounds
+        last_ring = max(cx - x0, x1 - cx, cy - y0, y1 - cy, 0)
+        sign = -1 if newest_first else 1
+        heap = []
+        for r in range(last_ring + 1):
+            for c in self._ring(cx, cy, r):
+                for p, item, counter in self.buckets.get(c, ()):
+                    heappush(heap, (self.distance(q, p), sign * counter, p, item))
+            bound = r * self.cell_size
+            while heap and heap[0][0] <= bound:
+                d, _, p, item = heappop(heap)
+                yield d, p, item
+        while heap:
+            d, _, p, item = heappop(heap)
+            yield d, p, item
+
+    def nearest(self, q):
+        """(distance, point, item) of the closest point to q or None if the index is empty"""
+        return next(self.iter_nearest(q), None)
+
+    def k_nearest(self, q, k):
+        return list(islice(self.iter_nearest(q), k))
+
+    def within(self, q, radius):
+        """all the (distance, point, item) with distance <= radius from q, sorted by distance"""
+        if self.bounds is None:
+            return []
+        cx, cy = self.cell(q)
+        reach = int(floor(radius / self.cell_size)) + 1
+        found = []
+        for x in range(cx - reach, cx + reach + 1):
+            for y in range(cy - reach, cy + reach + 1):
+                for p, item, counter in self.buckets.get((x, y), ()):
+                    d = self.distance(q, p)
+                    if d <= radius:
+                        found.append((d, counter, p, item))
+        found.sort()
+        return [(d, p, item) for d, _, p, item in found]
+
+
+class RRTTree(object):
+    """
+    An RRT tree in preallocated arrays: the point, the parent (the row of the parent node, the root is its own parent)
+    and the cost (the length of the path from the root) of every node. nodes 0..n-1 are in use, node 0 is the root.
+    reset starts a new tree in the same arrays, so replanning doesn't allocate as long as the tree fits
+    """
+
+    def __init__(self, capacity, cell_size=None, distance=manhattanDistance):
+        """
+        :param capacity: the number of nodes the arrays hold, they double when a tree outgrows them
+        :param cell_size: keep the nodes in a SpatialIndex with this cell size as well (for nearest first searches and
+                          radius queries)
+        :param distance: the distance of the SpatialIndex
+        """
+        self.coords = np.empty((capacity, 2))
+        self.parents = np.empty(capacity, dtype=np.int32)
+        self.costs = np.empty(capacity)
+        self.n = 0
+        self.index = SpatialIndex(cell_size, distance) if cell_size else None
+        self.reallocations = 0
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def points(self):
+        return self.coords[:self.n]
+
+    def point(self, i):
+        return float(self.coords[i, 0]), float(self.coords[i, 1])
+
+    def reset(self, root):
+        """start a new tree of just root"""
+        self.n = 0
+        if self.index is not None:
+            self.index.clear()
+        self.add(root, 0)
+
+    def add(self, q, parent):
+        """adds q as a child of the node parent, returns the row of the new node"""
+        if self.n == len(self.coords):
+            self.grow()
+        i = self.n
+        self.coords[i] = q
+        self.parents[i] = parent
+        self.costs[i] = 0.0 if i == 0 else self.costs[parent] + euclideanDistance(self.coords[parent], q)
+        if self.index is not None:
+            self.index.insert(q, i)
+        self.n += 1
+        return i
+
+    def grow(self):
+        capacity = 2 * len(self.coords)
+        for name in ('coords', 'parents', 'costs'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+        self.reallocations += 1
+
+    def nearest(self, q, free=None):
+        """
+        the row of the closest (manhattan) node to q, the newest of the ties, or None if there is none.
+        :param free: a boolean array over the nodes, only the True ones are considered
+        """
+        dists = np.abs(self.points - q).sum(axis=1)
+        if free is not None:
+            dists[~free] = INF
+        i = self.n - 1 - int(np.argmin(dists[::-1]))
+        return None if dists[i] == INF else i
+
+    def rewire(self, i, parent):
+        """
+        make parent the parent of node i, the costs of i and of the nodes under it change accordingly. after a rewire
+        a parent may come after its children, so the tree can't be rerooted anymore
+        """
+        n = self.n
+        delta = self.costs[parent] + euclideanDistance(self.coords[parent], self.coords[i]) - self.costs[i]
+        self.parents[i] = parent
+        parents = self.parents[:n]
+        under = np.zeros(n, dtype=bool)
+        under[i] = True
+        while True:  # a level of the subtree of i at a time
+            grown = under | under[parents]
+            grown[0] = False
+            if grown.sum() == under.sum():
+                break
+            under = grown
+        self.costs[:n][under] += delta
 
+    def branch(self, i):
+        """the rows of the nodes from node i up to the root, without the root"""
+        rows = []
+        while i != 0:
+            rows.append(i)
+            i = int(self.parents[i])
+        return rows
 
-class Roadmap(Mapping, object):
+    def path(self, i):
+        """the points from node i up to the root, without the root"""
+        return [self.point(row) for row in self.branch(i)]
 
-    def __init__(self, samples=[]):
+    def reroot(self, i):
+        """
+        keep only the subtree of node i, with i as the root. the nodes keep their order (a parent always comes before
+        its children) and their costs are from i. returns the number of nodes kept
+        """
+        keep = np.zeros(self.n, dtype=bool)
+        keep[i] = True
+        parents = self.parents
+        for j in range(i + 1, self.n):
+            keep[j] = keep[parents[j]]
+        rows = np.flatnonzero(keep)
+        renumbered = np.cumsum(keep) - 1
+        n = len(rows)
+        self.coords[:n] = self.coords[rows]
+        self.parents[:n] = renumbered[parents[rows]]
+        self.parents[0] = 0
+        self.costs[:n] = self.costs[rows] - self.costs[i]
+        self.n = n
+        if self.index is not None:
+            self.index.clear()
+            for row in range(n):
+                self.index.insert(self.point(row), row)
+        return n
+
+
+class BaseRoadmap(Mapping, object):
+    """
+    What the searches and the ghosts expect from a roadmap, on top of it every roadmap implements add, connect,
+    remove_edge, remove_vertex, neighbors, closest_node, dijkstra, a_star and for lazy PRM unchecked and mark_valid.
+    vertices are addressed by their point q
+    """
+
+    def __init__(self, cell_size=1.0):
         self.vertices = {}
-        self.edges = []
-        self.add(samples)
         # added by Arbel
         self.distance = manhattanDistance
+        self.index = SpatialIndex(cell_size, self.distance)
+        self.version = 0  # bumped on every change of the graph, used to invalidate cached searches
+        self.listeners = []  # incremental planners (and traces) told about every vertex and edge added or removed
+        self.dynamic = OrderedDict()  # vertices added while playing, from the least recently used
+        self.expanded = 0  # vertices expanded by all the searches run on this roadmap
+        self._trees = {}
+        self._trees_version = None
+        self._landmarks = None
 
     def __getitem__(self, q):
         return self.vertices[q]
@@ -99,20 +414,181 @@ class Roadmap(Mapping, object):
     def __iter__(self):
         return iter(self.vertices)
 
+    def shortest_path_tree(self, root, max_trees=8):
+        """
+        the ShortestPathTree rooted at the vertex root, shared by every caller until the roadmap changes (at most
+        max_trees roots are kept)
+        """
+        if self._trees_version != self.version:
+            self._trees = {}
+            self._trees_version = self.version
+        if root not in self._trees:
+            if len(self._trees) >= max_trees:
+                self._trees = {}
+            self._trees[root] = ShortestPathTree(self, root)
+        return self._trees[root]
+
+    def landmarks(self, k=8):
+        """the Landmarks of this roadmap (k of them), built on the first call and kept up to date as the roadmap changes"""
+        if self._landmarks is None or self._landmarks.k != k:
+            if self._landmarks is not None:
+                self.listeners.remove(self._landmarks)
+            self._landmarks = Landmarks(self, k)
+        return self._landmarks
+
+    def validate_path(self, path, collides):
+        """
+        lazy PRM: collision check the unchecked edges along path with collides(q1, q2), the ones that collide are
+        removed and the others are marked valid so they're never checked again. returns whether the path is valid
+        """
+        valid = True
+        for q1, q2 in zip(path, path[1:]):
+            if self.unchecked(q1, q2):
+                if collides(q1, q2):
+                    self.remove_edge(self[q1], self[q2])
+                    valid = False
+                else:
+                    self.mark_valid(q1, q2)
+        return valid
+
+    def add_dynamic(self, q):
+        """mark the vertex q as added while playing, such vertices can be evicted by evict_dynamic"""
+        self.dynamic[q] = True
+
+    def touch(self, path):
+        """mark the dynamic vertices on path as just used"""
+        for q in path:
+            if q in self.dynamic:
+                self.dynamic[q] = self.dynamic.pop(q)
+
+    def evict_dynamic(self, budget, keep=()):
+        """
+        remove the least recently used dynamic vertices until at most budget are left (vertices in keep are never
+        removed), the vertices that aren't dynamic (the sampled roadmap) are never removed. returns the removed vertices
+        """
+        evicted = []
+        for q in list(self.dynamic):
+            if len(self.dynamic) <= budget:
+                break
+            if q in keep:
+                continue
+            del self.dynamic[q]
+            if q in self.vertices:
+                self.remove_vertex(q)
+                evicted.append(q)
+        return evicted
+
+    def by_distance(self, v):
+        """yields the vertices (as points) in increasing distance from v, lazily"""
+        for _, q, _ in self.index.iter_nearest(v):
+            yield q
+
+    def k_nearest(self, v, k):
+        return list(islice(self.by_distance(v), k))
+
+    def within(self, v, radius):
+        """the vertices (as points) at distance at most radius from v, closest first"""
+        return [q for _, q, _ in self.index.within(v, radius)]
+
+    def bidirectional_dijkstra(self, start_node, stop_node):
+        """
+        dijkstra from both ends at once, it stops once the tops of the two queues sum to at least the cost of the best
+        path met so far. stop_node has to be a vertex, start_node may be any point (it's expanded like its closest
+        vertex, as in a_star). returns a SearchResult
+        """
+        zero = lambda n: 0
+        return self._bidirectional(start_node, stop_node, zero, zero, lambda top_f, top_b, mu: top_f + top_b >= mu)
+
+    def bidirectional_a_star(self, start_node, stop_node, h=euclideanDistance):
+        """
+        A* from both ends at once with the average potentials of Ikeda et al.: the forward search estimates with
+        p(n) = (h(n, stop_node) - h(n, start_node)) / 2 and the backward one with -p(n), h has to be admissible and
+        consistent. both searches then see the same (non negative) reduced edge costs, so it's a bidirectional dijkstra
+        over them and stops the same way (the potentials of the two tops cancel out against the reduced cost of the
+        best path). returns a SearchResult
+        """
+        p = lambda n: (h(n, stop_node) - h(n, start_node)) / 2.0
+        return self._bidirectional(start_node, stop_node, p, lambda n: -p(n),
+                                   lambda top_f, top_b, mu: top_f + top_b >= mu)
+
+    def _bidirectional(self, start_node, stop_node, h_forward, h_backward, done):
+        started = time.time()
+        if stop_node not in self.vertices:
+            return SearchResult(None, INF, 0, 0, time.time() - started)
+        # g, parents, closed, heap and heuristic of the forward and the backward search
+        sides = [({start_node: 0}, {start_node: None}, set(), [(h_forward(start_node), 0, start_node)], h_forward),
+                 ({stop_node: 0}, {stop_node: None}, set(), [(h_backward(stop_node), 0, stop_node)], h_backward)]
+        mu, meet = (0, start_node) if start_node == stop_node else (INF, None)
+        pushes, expanded = 2, 0
+        while True:
+            tops = []
+            for g, _, closed, heap, _ in sides:
+                while heap and (heap[0][2] in closed or -heap[0][1] > g[heap[0][2]]):
+                    heappop(heap)  # stale entry
+                tops.append(heap[0][0] if heap else INF)
+            if done(tops[0], tops[1], mu):
+                break
+            side = 0 if len(sides[0][3]) <= len(sides[1][3]) else 1  # grow the smaller frontier
+            g, parents, closed, heap, h = sides[side]
+            other_g = sides[1 - side][0]
+            _, _, n = heappop(heap)
+            closed.add(n)
+            expanded += 1
+            self.expanded += 1
+            for m in self.neighbors(n):
+                if m in closed:
+                    continue
+                cost = g[n] + self.distance(n, m)
+                if cost < g.get(m, INF):
+                    g[m] = cost
+                    parents[m] = n
+                    heappush(heap, (cost + h(m), -cost, m))
+                    pushes += 1
+                if m in other_g and g[m] + other_g[m] < mu:
+                    mu, meet = g[m] + other_g[m], m
+        if meet is None:
+            return SearchResult(None, INF, expanded, pushes, time.time() - started)
+        path, n = [], meet
+        while n is not None:
+            path.append(n)
+            n = sides[0][1][n]
+        path.reverse()
+        n = sides[1][1][meet]
+        while n is not None:
+            path.append(n)
+            n = sides[1][1][n]
+        return SearchResult(path, mu, expanded, pushes, time.time() - started)
+
+
+class Roadmap(BaseRoadmap):
+
+    def __init__(self, samples=[], cell_size=1.0):
+        BaseRoadmap.__init__(self, cell_size)
+        self.edges = []
+        self.add(samples)
+
     def add(self, samples):
         new_vertices = []
         for q in samples:
             if q not in self:
                 self.vertices[q] = Vertex(q)
+                self.index.insert(q)
                 new_vertices.append(self[q])
+                for listener in self.listeners:
+                    listener.vertex_added(q)
+        if new_vertices:
+            self.version += 1
         return new_vertices
 
-    def connect(self, v1, v2, path=None):
+    def connect(self, v1, v2, path=None, valid=True):
         if v1==v2:
             return None
         if v1 not in v2.edges:
-            edge = Edge(v1, v2, path)
+            edge = Edge(v1, v2, path, valid)
             self.edges.append(edge)
+            self.version += 1
+            for listener in self.listeners:
+                listener.edge_added(v1.q, v2.q)
             return edge
         return None
 
@@ -123,37 +599,88 @@ class Roadmap(Mapping, object):
             e.clear()
 
 
-    def remove_vertex(self,v): # currently disfunctional
-        print "number of vertices", len(self.vertices)
-        print "number of edges", len(self.edges)
-        v=self.vertices[(round(v[0], 3),round(v[1], 3))]
-        for e in v.edges.values():
-            e.clear()
+    def unchecked(self, q1, q2):
+        """whether there's an edge between q1 and q2 that wasn't collision checked yet"""
+        v1, v2 = self.vertices.get(q1), self.vertices.get(q2)
+        return v1 is not None and v2 in v1.edges and v1.edges[v2].valid is None
+
+    def mark_valid(self, q1, q2):
+        self.vertices[q1].edges[self.vertices[q2]].valid = True
+
+    def remove_edge(self, v1, v2):
+        """removes the edge between v1 and v2, returns it (None if there isn't one)"""
+        edge = v1.edges.pop(v2, None)
+        if edge is None:
+            return None
+        del v2.edges[v1]
+        edge.clear()
+        self.edges.remove(edge)
+        self.version += 1
+        for listener in self.listeners:
+            listener.edge_removed(v1.q, v2.q)
+        return edge
+
+    def remove_vertex(self, v):
+        """removes a vertex together with all of its edges"""
+        v = self.vertices[(round(v[0], 3), round(v[1], 3))]
+        neighbors = [u.q for u in v.edges]
+        for u, edge in list(v.edges.items()):
+            edge.clear()
+            del u.edges[v]
+        v.edges = {}
+        self.edges = [e for e in self.edges if e.v1 is not v and e.v2 is not v]
+        self.index.remove(v.q)
         del self.vertices[v.q]
-        print "number of vertices", len(self.vertices)
-        print "number of edges", len(self.edges)
+        self.dynamic.pop(v.q, None)
+        self.version += 1
+        for listener in self.listeners:
+            listener.vertex_removed(v.q, neighbors)
+
     @staticmethod
     def merge(*roadmaps):
-        new_roadmap = Roadmap()
-        new_roadmap.vertices = merge_dicts(
-            *[roadmap.vertices for roadmap in roadmaps])
-        new_roadmap.edges = list(
-            flatten(roadmap.edges for roadmap in roadmaps))
+        """
+        merge several roadmaps into a new one, the vertices and edges are copied so the adjacency of each vertex in
+        the new roadmap only refers to vertices of the new roadmap
+        """
+        new_roadmap = Roadmap(cell_size=roadmaps[0].index.cell_size if roadmaps else 1.0)
+        for roadmap in roadmaps:
+            new_roadmap.add(roadmap.vertices)
+        for edge in flatten(roadmap.edges for roadmap in roadmaps):
+            new_roadmap.connect(new_roadmap[edge.v1.q], new_roadmap[edge.v2.q], edge._path, edge.valid)
         return new_roadmap
+
+    def to_arrays(self):
+        """the roadmap as coordinates and CSR adjacency arrays (coords, indptr, indices, weights)"""
+        points = list(self.vertices)
+        ids = dict((q, i) for i, q in enumerate(points))
+        indptr, indices, weights = [0], [], []
+        for q in points:
+            for u in self.vertices[q].edges:
+                indices.append(ids[u.q])
+                weights.append(self.distance(q, u.q))
+            indptr.append(len(indices))
+        return (np.array(points, dtype=np.float64).reshape(-1, 2), np.array(indptr, dtype=np.int64),
+                np.array(indices, dtype=np.int32), np.array(weights, dtype=np.float64))
+
+    @classmethod
+    def from_arrays(cls, coords, indptr, indices, weights, cell_size=1.0):
+        points = [tuple(p) for p in coords.tolist()]
+        roadmap = cls(points, cell_size)
+        indptr, indices = indptr.tolist(), indices.tolist()
+        for i, q in enumerate(points):
+            for j in indices[indptr[i]:indptr[i + 1]]:
+                if i < j:
+                    roadmap.connect(roadmap[q], roadmap[points[j]])
+        return roadmap
+
     ##### Arbel's code #####
     def neighbors(self, v):
-        neighbors = []
+        """returns the neighbors of v (or of the closest node to v if it's not in the roadmap) in O(degree)"""
         if v in self.vertices:
-            v=self.vertices[(round(v[0], 3),round(v[1], 3))]
+            v = self.vertices[(round(v[0], 3), round(v[1], 3))]
         else:
-            v=self.closest_node(v)
-        for edge in self.edges:
-            if edge.v1 == v:
-                neighbors.append(edge.v2.q)
-            if edge.v2 == v:
-                neighbors.append(edge.v1.q)
-        neighbors = list(set(neighbors))
-        return neighbors
+            v = self.closest_node(v)
+        return [u.q for u in v.edges]
 
     def dijkstra(self, v1, v2, tolerance=0.5):
         heap = [(0, v1, [])]
@@ -164,6 +691,7 @@ class Roadmap(Mapping, object):
             if v in visited:
                 continue
             visited.add(v)
+            self.expanded += 1
             path = path + [v]
             if self.distance(v,v2)<tolerance:#v == v2:
                 return path
@@ -176,87 +704,684 @@ class Roadmap(Mapping, object):
 
     def closest_node(self, v):
         """Returns the closest node to v"""
-        min_dist = float('inf')
-        closest_node = None
-        for node in self.vertices.values():
-            dist = self.distance(node.q, v)
-            if dist < min_dist:
-                min_dist = dist
-                closest_node = node
-        return closest_node
-
-    def a_star(self, start_node, stop_node, h=lambda n: 0, distance=manhattanDistance):
-        # open_list is a list of nodes which have been visited, but who's neighbors
-        # haven't all been inspected, starts off with the start node
-        # closed_list is a list of nodes which have been visited
-        # and who's neighbors have been inspected
-        open_list = {start_node}
-        closed_list = set([])
-
-        # g contains current distances from start_node to all other nodes
-        # the default value (if it's not found in the map) is +infinity
-        g = {}
-
-        g[start_node] = 0
-
-        # parents contains an adjacency map of all nodes
-        parents = {}
-        parents[start_node] = start_node
-
-        while len(open_list) > 0:
-            n = None
-
-            # find a node with the lowest value of f() - evaluation function
-            for v in open_list:
-                if n == None or g[v] + h(v) < g[n] + h(n):
-                    n = v
-
-            if n == None:
-                print('Path does not exist!')
-                return None
+        nearest = self.index.nearest(v)
+        if nearest is None:
+            return None
+        return self.vertices[nearest[1]]
 
-            # if the current node is the stop_node
-            # then we begin reconstruction the path from it to the start_node
+    def a_star(self, start_node, stop_node, h=None, distance=manhattanDistance):
+        """
+        A* over the roadmap with a binary heap, stale heap entries are skipped when popped (lazy deletion).
+        :param h: admissible heuristic h(n) of the cost from n to stop_node, euclidean distance to stop_node by default
+            (a lower bound for paths weighted by manhattan distance)
+        :param distance: the edge weight
+        :return: a SearchResult, its path is None if stop_node can't be reached
+        """
+        started = time.time()
+        if h is None:
+            h = lambda n: euclideanDistance(n, stop_node)
+        g = {start_node: 0}
+        parents = {start_node: None}
+        closed = set()
+        heap = [(h(start_node), 0, start_node)]
+        pushes, expanded = 1, 0
+        while heap:
+            f, neg_g, n = heappop(heap)
+            if n in closed or -neg_g > g[n]:
+                continue  # stale entry, n was already reached with a lower cost
+            closed.add(n)
+            expanded += 1
+            self.expanded += 1
             if n == stop_node:
-                reconst_path = []
-
-                while parents[n] != n:
-                    reconst_path.append(n)
+                path = []
+                while n is not None:
+                    path.append(n)
                     n = parents[n]
+                path.reverse()
+                return SearchResult(path, g[stop_node], expanded, pushes, time.time() - started)
+            for m in self.neighbors(n):
+                if m in closed:
+                    continue
+                cost = g[n] + distance(n, m)
+                if cost < g.get(m, INF):
+                    g[m] = cost
+                    parents[m] = n
+                    heappush(heap, (cost + h(m), -cost, m))  # ties go to the deeper node
+                    pushes += 1
+        return SearchResult(None, INF, expanded, pushes, time.time() - started)
 
-                reconst_path.append(start_node)
 
-                reconst_path.reverse()
+VertexView = namedtuple('VertexView', ['q', 'id'])
 
-                print('Path found: {}'.format(reconst_path))
-                return reconst_path
 
-            # for all neighbors of the current node do
-            for m in self.neighbors(n):
-                weight = distance(n,m) #m.weight
-                # if the current node isn't in both open_list and closed_list
-                # add it to open_list and note n as it's parent
-                if m not in open_list and m not in closed_list:
-                    open_list.add(m)
-                    parents[m] = n
-                    g[m] = g[n] + weight
+class EdgeView(namedtuple('EdgeView', ['q1', 'q2', 'weight'])):
+    """an edge of a CompactRoadmap, printed like an Edge"""
 
-                # otherwise, check if it's quicker to first visit n, then m
-                # and if it is, update parent data and g data
-                # and if the node was in the closed_list, move it to open_list
+    def __str__(self):
+        return 'Edge(' + str(self.q1) + ' - ' + str(self.q2) + ')'
+
+    __repr__ = __str__
+
+
+class CompactRoadmap(BaseRoadmap):
+    """
+    An array backed roadmap with the same query API as Roadmap.
+    vertices are numbered in insertion order and their coordinates kept in a numpy array, the adjacency is kept in CSR
+    form (row i of the graph is indices[indptr[i]:indptr[i+1]] with the edge weights in weights) and the edges added
+    since the last compaction wait in an append buffer that is merged into the CSR arrays once it holds compact_every
+    edges (or half of the edges of the roadmap if that's more). vertices[q] (and roadmap[q]) is the number of the
+    vertex q, connect and remove_edge take vertex numbers.
+    removed edges are marked in the CSR arrays with a -1 neighbor (a tombstone) until the next compaction drops them,
+    the numbers of removed vertices are reused by the next added vertices.
+    """
+
+    def __init__(self, samples=[], cell_size=1.0, compact_every=4096):
+        BaseRoadmap.__init__(self, cell_size)
+        self.compact_every = compact_every
+        self.points = []  # vertex number -> q
+        self.coords = np.zeros((64, 2))
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0)
+        self.pending = {}  # vertex number -> [neighbor numbers], [weights] of the edges added since the compaction
+        self.num_pending = 0
+        self.num_edges = 0
+        self.tombstones = 0  # removed edge entries still in the CSR arrays
+        self.free = []  # numbers of removed vertices
+        self.unchecked_edges = set()  # (i, j), i < j, of the edges that weren't collision checked yet (lazy PRM)
+        self.add(samples)
+
+    def add(self, samples):
+        new_vertices = []
+        for q in samples:
+            if q not in self:
+                if self.free:
+                    i = self.free.pop()
+                    self.points[i] = q
                 else:
-                    if g[m] > g[n] + weight:
-                        g[m] = g[n] + weight
-                        parents[m] = n
+                    i = len(self.points)
+                    if i == len(self.coords):
+                        self.coords = np.concatenate([self.coords, np.zeros_like(self.coords)])
+                    self.points.append(q)
+                self.coords[i] = q
+                self.vertices[q] = i
+                self.index.insert(q, i)
+                new_vertices.append(i)
+                for listener in self.listeners:
+                    listener.vertex_added(q)
+        if new_vertices:
+            self.version += 1
+        return new_vertices
+
+    def _row(self, i):
+        """the neighbor numbers and the edge weights of vertex number i"""
+        ids, weights = [], []
+        if i + 1 < len(self.indptr):
+            a, b = self.indptr[i], self.indptr[i + 1]
+            ids, weights = self.indices[a:b], self.weights[a:b]
+            if self.tombstones:
+                live = ids >= 0
+                ids, weights = ids[live], weights[live]
+            ids, weights = ids.tolist(), weights.tolist()
+        if i in self.pending:
+            ids = ids + self.pending[i][0]
+            weights = weights + self.pending[i][1]
+        return ids, weights
+
+    def connect(self, i, j, path=None, valid=True):
+        if i == j or j in self._row(i)[0]:
+            return None
+        if valid is None:
+            self.unchecked_edges.add((min(i, j), max(i, j)))
+        weight = self.distance(self.points[i], self.points[j])
+        for a, b in ((i, j), (j, i)):
+            row = self.pending.setdefault(a, ([], []))
+            row[0].append(b)
+            row[1].append(weight)
+        self.num_pending += 1
+        self.num_edges += 1
+        self.version += 1
+        self._maybe_compact()
+        for listener in self.listeners:
+            listener.edge_added(self.points[i], self.points[j])
+        return EdgeView(self.points[i], self.points[j], weight)
+
+    def _unlink(self, i, j):
+        """removes j from the row of i"""
+        if i in self.pending and j in self.pending[i][0]:
+            k = self.pending[i][0].index(j)
+            del self.pending[i][0][k]
+            del self.pending[i][1][k]
+        elif i + 1 < len(self.indptr):
+            a, b = self.indptr[i], self.indptr[i + 1]
+            hits = np.flatnonzero(self.indices[a:b] == j)
+            if len(hits):
+                self._writable()
+                self.indices[a + hits[0]] = -1
+                self.tombstones += 1
+
+    def _writable(self):
+        if not self.indices.flags.writeable:  # memory mapped from the roadmap cache
+            self.indices = np.array(self.indices)
+
+    def _maybe_compact(self):
+        # amortized O(1) per added or removed edge
+        if self.num_pending >= max(self.compact_every, self.num_edges // 2) or \
+                self.tombstones >= max(self.compact_every, self.num_edges):
+            self.compact()
+
+    def remove_edge(self, i, j):
+        """removes the edge between the vertex numbers i and j, returns it (None if there isn't one)"""
+        ids, weights = self._row(i)
+        if j not in ids:
+            return None
+        edge = EdgeView(self.points[i], self.points[j], weights[ids.index(j)])
+        self.unchecked_edges.discard((min(i, j), max(i, j)))
+        self._unlink(i, j)
+        self._unlink(j, i)
+        self.num_edges -= 1
+        self.version += 1
+        self._maybe_compact()
+        for listener in self.listeners:
+            listener.edge_removed(edge.q1, edge.q2)
+        return edge
+
+    def unchecked(self, q1, q2):
+        """whether there's an edge between q1 and q2 that wasn't collision checked yet"""
+        i, j = self.vertices.get(q1), self.vertices.get(q2)
+        return i is not None and j is not None and (min(i, j), max(i, j)) in self.unchecked_edges
+
+    def mark_valid(self, q1, q2):
+        i, j = self.vertices[q1], self.vertices[q2]
+        self.unchecked_edges.discard((min(i, j), max(i, j)))
+
+    def remove_vertex(self, v):
+        """removes a vertex together with all of its edges"""
+        q = (round(v[0], 3), round(v[1], 3))
+        i = self.vertices[q]
+        ids = self._row(i)[0]
+        for j in ids:
+            self._unlink(j, i)
+            self.unchecked_edges.discard((min(i, j), max(i, j)))
+        self.pending.pop(i, None)
+        if i + 1 < len(self.indptr):
+            a, b = self.indptr[i], self.indptr[i + 1]
+            self._writable()
+            self.tombstones += int((self.indices[a:b] >= 0).sum())
+            self.indices[a:b] = -1
+        self.num_edges -= len(ids)
+        del self.vertices[q]
+        self.index.remove(q, i)
+        self.points[i] = None
+        self.free.append(i)
+        self.dynamic.pop(q, None)
+        self.version += 1
+        self._maybe_compact()
+        for listener in self.listeners:
+            listener.vertex_removed(q, [self.points[j] for j in ids])
+
+    def compact(self):
+        """merge the append buffer into the CSR arrays"""
+        n = len(self.points)
+        rows = len(self.indptr) - 1
+        new_sources, new_targets, new_weights = [], [], []
+        for i, (ids, ws) in self.pending.items():
+            new_sources.extend([i] * len(ids))
+            new_targets.extend(ids)
+            new_weights.extend(ws)
+        sources = np.concatenate([np.repeat(np.arange(rows), np.diff(self.indptr)), new_sources]).astype(np.int64)
+        targets = np.concatenate([self.indices, new_targets])
+        weights = np.concatenate([self.weights, new_weights])
+        if self.tombstones:
+            live = targets >= 0
+            sources, targets, weights = sources[live], targets[live], weights[live]
+        order = np.argsort(sources, kind='mergesort')  # stable, the old neighbors stay first
+        self.indices = targets[order].astype(np.int32)
+        self.weights = weights[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=self.indptr[1:])
+        self.pending = {}
+        self.num_pending = 0
+        self.tombstones = 0
+
+    def to_arrays(self):
+        """the roadmap as coordinates and CSR adjacency arrays (coords, indptr, indices, weights)"""
+        self.compact()
+        if not self.free:
+            return self.coords[:len(self.points)], self.indptr, self.indices, self.weights
+        # renumber the vertices without the removed ones, their rows are empty
+        live = np.array([i for i, q in enumerate(self.points) if q is not None], dtype=np.int64)
+        numbers = np.full(len(self.points), -1, dtype=np.int64)
+        numbers[live] = np.arange(len(live))
+        indptr = np.append(self.indptr[live], self.indptr[-1])
+        return self.coords[live], indptr, numbers[self.indices].astype(np.int32), self.weights
+
+    @classmethod
+    def from_arrays(cls, coords, indptr, indices, weights, cell_size=1.0):
+        """
+        a roadmap over existing CSR arrays, they aren't copied (so they may be memory mapped) until the next
+        compaction
+        """
+        roadmap = cls([], cell_size)
+        roadmap.add([tuple(p) for p in coords.tolist()])
+        roadmap.indptr, roadmap.indices, roadmap.weights = indptr, indices, weights
+        roadmap.num_edges = len(indices) // 2
+        return roadmap
+
+    @property
+    def edges(self):
+        edges = []
+        for i, q in enumerate(self.points):
+            if q is None:
+                continue
+            for j, w in zip(*self._row(i)):
+                if i < j:
+                    edges.append(EdgeView(q, self.points[j], w))
+        return edges
+
+    def _id(self, v):
+        """the number of the vertex v, or of the closest vertex to v if it's not in the roadmap"""
+        if v in self.vertices:
+            return self.vertices[v]
+        nearest = self.index.nearest(v)
+        return None if nearest is None else nearest[2]
+
+    def neighbors(self, v):
+        """returns the neighbors of v (or of the closest node to v if it's not in the roadmap) in O(degree)"""
+        i = self._id(v)
+        if i is None:
+            return []
+        return [self.points[j] for j in self._row(i)[0]]
+
+    def closest_node(self, v):
+        """Returns the closest node to v"""
+        nearest = self.index.nearest(v)
+        if nearest is None:
+            return None
+        return VertexView(nearest[1], nearest[2])
+
+    def _expand(self, v, node):
+        """the neighbor numbers and weights of a search node, len(points) stands for the start when it isn't a vertex"""
+        if node == len(self.points):
+            ids = self._row(self._id(v))[0]
+            return ids, [self.distance(v, self.points[j]) for j in ids]
+        return self._row(node)
+
+    def _path(self, v, node, parents):
+        path = []
+        while node != -1:
+            path.append(v if node == len(self.points) else self.points[node])
+            node = parents[node]
+        path.reverse()
+        return path
+
+    def dijkstra(self, v1, v2, tolerance=0.5):
+        n = len(self.points)
+        if not n:
+            return None
+        v1 = (float(v1[0]), float(v1[1]))
+        start = self.vertices.get(v1, n)
+        dist, parents, visited = [INF] * (n + 1), [-1] * (n + 1), bytearray(n + 1)
+        dist[start] = 0
+        heap = [(0, start)]
+        while heap:
+            d, node = heappop(heap)
+            if visited[node]:
+                continue
+            visited[node] = 1
+            self.expanded += 1
+            if self.distance(v1 if node == n else self.points[node], v2) < tolerance:
+                return self._path(v1, node, parents)
+            for j, w in zip(*self._expand(v1, node)):
+                if not visited[j] and d + w < dist[j]:
+                    dist[j] = d + w
+                    parents[j] = node
+                    heappush(heap, (d + w, j))
+        print('No path found between {} and {}'.format(v1, v2))
+        return None
+
+    def a_star(self, start_node, stop_node, h=None):
+        """A* over the roadmap like Roadmap.a_star, the edge weights are the stored manhattan distances"""
+        started = time.time()
+        n = len(self.points)
+        goal = self.vertices.get(stop_node)
+        if goal is None:
+            return SearchResult(None, INF, 0, 0, time.time() - started)
+        if h is None:  # the euclidean distance to the goal of all the vertices at once
+            hs = np.sqrt(((self.coords[:n] - self.coords[goal]) ** 2).sum(axis=1)).tolist()
+            hs.append(euclideanDistance(start_node, stop_node))
+            heuristic = hs.__getitem__
+        else:
+            heuristic = lambda j: h(start_node if j == n else self.points[j])
+        start = self.vertices.get(start_node, n)
+        g, parents, closed = [INF] * (n + 1), [-1] * (n + 1), bytearray(n + 1)
+        g[start] = 0
+        heap = [(heuristic(start), 0, start)]
+        pushes, expanded = 1, 0
+        while heap:
+            f, neg_g, node = heappop(heap)
+            if closed[node] or -neg_g > g[node]:
+                continue
+            closed[node] = 1
+            expanded += 1
+            self.expanded += 1
+            if node == goal:
+                return SearchResult(self._path(start_node, node, parents), g[node], expanded, pushes,
+                                    time.time() - started)
+            for j, w in zip(*self._expand(start_node, node)):
+                cost = g[node] + w
+                if not closed[j] and cost < g[j]:
+                    g[j] = cost
+                    parents[j] = node
+                    heappush(heap, (cost + heuristic(j), -cost, j))
+                    pushes += 1
+        return SearchResult(None, INF, expanded, pushes, time.time() - started)
+
+class MovingTargetDStarLite(object):
+    """
+    Incremental search on a roadmap for a hunter chasing a moving target (Moving Target D* Lite, Sun, Yeoh & Koenig).
+    a forward LPA* search from the start (the ghost) to the goal (pacman) whose g/rhs values are kept between plans:
+     - when the goal moves the keys are corrected with km instead of being recomputed
+     - when the start moves along the previous path, only the part of the search tree that isn't under the new start
+       is thrown away (g values under the new start stay offset by the cost of the old start to it)
+     - vertices and edges added to (or removed from) the roadmap are repaired locally, the engine listens to the
+       roadmap for these changes
+    """
+
+    def __init__(self, roadmap, h=euclideanDistance):
+        self.roadmap = roadmap
+        self.h = h
+        self.expanded = 0
+        self.reset(None, None)
+        roadmap.listeners.append(self)
+
+    def reset(self, start, goal):
+        self.start, self.goal = start, goal
+        self.km = 0
+        self.g, self.rhs, self.parent = {}, {}, {}
+        self.open = {}  # vertex -> (key, entry id) of its live heap entry
+        self.heap = []
+        self._entries = 0
+        if start is not None:
+            self.rhs[start] = 0
+            self.parent[start] = None
+            self._push(start)
+
+    def key(self, s):
+        k = min(self.g.get(s, INF), self.rhs.get(s, INF))
+        return k + self.h(s, self.goal) + self.km, k
+
+    def _push(self, s):
+        key = self.key(s)
+        self._entries += 1
+        self.open[s] = (key, self._entries)
+        heappush(self.heap, (key, self._entries, s))
+
+    def _top(self):
+        while self.heap:
+            key, entry, s = self.heap[0]
+            if self.open.get(s, (None, None))[1] == entry:
+                return key, s
+            heappop(self.heap)  # stale entry
+        return (INF, INF), None
+
+    def _preds(self, s):
+        if s not in self.roadmap:
+            return []
+        return self.roadmap.neighbors(s)
+
+    def update_state(self, u):
+        if u != self.start:
+            best, parent = INF, None
+            for p in self._preds(u):
+                cost = self.g.get(p, INF) + self.roadmap.distance(p, u)
+                if cost < best:
+                    best, parent = cost, p
+            self.rhs[u], self.parent[u] = best, parent
+        self.open.pop(u, None)
+        if self.g.get(u, INF) != self.rhs.get(u, INF):
+            self._push(u)
+
+    def compute_path(self):
+        goal = self.goal
+        while True:
+            top_key, u = self._top()
+            if u is None or (top_key >= self.key(goal) and self.rhs.get(goal, INF) <= self.g.get(goal, INF)):
+                return
+            self.expanded += 1
+            self.roadmap.expanded += 1
+            new_key = self.key(u)
+            if top_key < new_key:
+                self._push(u)
+            elif self.g.get(u, INF) > self.rhs.get(u, INF):
+                self.g[u] = self.rhs[u]
+                self.open.pop(u, None)
+                for s in self._preds(u):
+                    self.update_state(s)
+            else:
+                self.g[u] = INF
+                for s in self._preds(u) + [u]:
+                    self.update_state(s)
+
+    def _in_subtree(self, s, root, memo):
+        """whether following the parents from s reaches root"""
+        chain = []
+        while s is not None and s not in memo:
+            if s == root:
+                memo[s] = True
+                break
+            chain.append(s)
+            memo[s] = False  # until proven otherwise, so a cycle of parents (left by removed edges) ends the walk
+            s = self.parent.get(s)
+        result = memo.get(s, False) if s is not None else False
+        for c in chain:
+            memo[c] = result
+        return result
+
+    def move_start(self, start):
+        """the start moved to a vertex of the old search tree, drop everything that isn't under it"""
+        memo = {}
+        deleted = [s for s in list(self.rhs) if s != start and not self._in_subtree(s, start, memo)]
+        self.parent[start] = None
+        for s in deleted:
+            self.g[s] = self.rhs[s] = INF
+            self.parent[s] = None
+            self.open.pop(s, None)
+        self.start = start
+        for s in deleted:
+            self.update_state(s)
+
+    def plan(self, start, goal):
+        """a shortest path (as a list of vertices) from the vertex start to the vertex goal, None if there isn't one"""
+        if self.start is None or start not in self.roadmap or self.g.get(start, INF) == INF:
+            self.reset(start, goal)
+        else:
+            if goal != self.goal:
+                self.km += self.h(self.goal, goal)
+                self.goal = goal
+            if start != self.start:
+                self.move_start(start)
+        self.compute_path()
+        if self.rhs.get(goal, INF) == INF:
+            return None
+        path, s, seen = [goal], goal, {goal}
+        while s != self.start:
+            s = self.parent.get(s)
+            if s is None or s in seen:
+                return None
+            seen.add(s)
+            path.append(s)
+        path.reverse()
+        return path
+
+    # roadmap listener
+    def vertex_added(self, q):
+        pass  # it has no edges yet
+
+    def edge_added(self, q1, q2):
+        if self.start is not None:
+            self.update_state(q1)
+            self.update_state(q2)
+
+    def edge_removed(self, q1, q2):
+        if self.start is not None:
+            self.update_state(q1)
+            self.update_state(q2)
+
+    def vertex_removed(self, q, neighbors):
+        if self.start is None:
+            return
+        if q == self.start:
+            self.reset(None, None)
+            return
+        for d in (self.g, self.rhs, self.parent, self.open):
+            d.pop(q, None)
+        for s in neighbors:
+            self.update_state(s)
+
+
+class Landmarks(object):
+    """
+    ALT (A*, landmarks and the triangle inequality) lower bounds on the roadmap distances, Goldberg & Harrelson.
+    the exact distances from k landmark vertices to every vertex are kept in tables, for any vertices a, b and
+    landmark L |d(L, a) - d(L, b)| <= d(a, b). the landmarks are picked farthest first among the sampled vertices.
+    the tables listen to the roadmap: added edges only shorten distances and are propagated from the edge, removed
+    edges and vertices only lengthen the distances of the vertices whose shortest paths went through them (found
+    through the tight edges, d(L, v) = d(L, u) + w(u, v)), and those are recomputed from their unaffected neighbors.
+    a removed landmark makes the landmarks be picked again on the next query.
+    """
+
+    def __init__(self, roadmap, k=8):
+        self.roadmap = roadmap
+        self.k = k
+        self.landmarks, self.tables = [], []
+        self.stale = True
+        roadmap.listeners.append(self)
+
+    def build(self):
+        """pick the landmarks and compute their tables"""
+        roadmap = self.roadmap
+        candidates = [q for q in roadmap.vertices if q not in roadmap.dynamic and roadmap.neighbors(q)]
+        self.landmarks, self.tables = [], []
+        self.stale = False
+        if not candidates:
+            return
+        # farthest first: start at the farthest vertex from the best connected one, then always take the vertex
+        # farthest from all the landmarks so far (unreachable vertices don't count)
+        closest = self._distances(max(candidates, key=lambda q: len(roadmap.neighbors(q))))
+        while len(self.landmarks) < self.k:
+            far = max(candidates, key=lambda q: closest.get(q, -1))
+            if far in self.landmarks:
+                break
+            self.landmarks.append(far)
+            self.tables.append(self._distances(far))
+            if len(self.landmarks) == 1:
+                closest = dict(self.tables[0])
+            for q, d in self.tables[-1].items():
+                if d < closest[q]:
+                    closest[q] = d
+
+    def _distances(self, source):
+        table = {source: 0}
+        self._propagate(table, [(0, source)])
+        return table
+
+    def _propagate(self, table, heap):
+        """dijkstra from the vertices in heap, only lowering the distances in table"""
+        roadmap = self.roadmap
+        while heap:
+            d, u = heappop(heap)
+            if d > table.get(u, INF):
+                continue
+            for v in roadmap.neighbors(u):
+                cost = d + roadmap.distance(u, v)
+                if cost < table.get(v, INF):
+                    table[v] = cost
+                    heappush(heap, (cost, v))
+
+    def _tight(self, table, u, v):
+        """whether the shortest path to v may go through u"""
+        return u in table and v in table and abs(table[u] + self.roadmap.distance(u, v) - table[v]) < 1e-9
+
+    def _repair(self, table, roots):
+        """the distances of roots and of everything under them through tight edges may have grown, recompute them"""
+        roadmap = self.roadmap
+        affected, stack = set(), list(roots)
+        while stack:
+            u = stack.pop()
+            if u in affected or u not in table:
+                continue
+            affected.add(u)
+            stack.extend(v for v in roadmap.neighbors(u) if v not in affected and self._tight(table, u, v))
+        for u in affected:
+            del table[u]
+        heap = []
+        for u in affected:
+            best = min([table[v] + roadmap.distance(v, u) for v in roadmap.neighbors(u) if v in table] or [INF])
+            if best < INF:
+                table[u] = best
+                heappush(heap, (best, u))
+        self._propagate(table, heap)
+
+    def lower_bound(self, a, b):
+        """a lower bound of the roadmap distance between a and b, at least their euclidean distance"""
+        if self.stale:
+            self.build()
+        best = euclideanDistance(a, b)
+        for table in self.tables:
+            if a in table and b in table:
+                best = max(best, abs(table[a] - table[b]))
+        return best
+
+    def heuristic(self, goal):
+        """h(n) = lower_bound(n, goal) for a_star, with the distances of goal looked up once"""
+        if self.stale:
+            self.build()
+        goal_distances = [(table, table[goal]) for table in self.tables if goal in table]
+
+        def h(n):
+            best = euclideanDistance(n, goal)
+            for table, d in goal_distances:
+                if n in table:
+                    diff = abs(table[n] - d)
+                    if diff > best:
+                        best = diff
+            return best
+        return h
+
+    # roadmap listener
+    def vertex_added(self, q):
+        pass  # it has no edges yet
 
-                        if m in closed_list:
-                            closed_list.remove(m)
-                            open_list.add   (m)
+    def edge_added(self, q1, q2):
+        if self.stale:
+            return
+        w = self.roadmap.distance(q1, q2)
+        for table in self.tables:
+            d1, d2 = table.get(q1, INF), table.get(q2, INF)
+            if d1 + w < d2:
+                table[q2] = d1 + w
+                self._propagate(table, [(d1 + w, q2)])
+            elif d2 + w < d1:
+                table[q1] = d2 + w
+                self._propagate(table, [(d2 + w, q1)])
 
-            # remove n from the open_list, and add it to closed_list
-            # because all of his neighbors were inspected
-            open_list.remove(n)
-            closed_list.add(n)
+    def edge_removed(self, q1, q2):
+        if self.stale:
+            return
+        for table in self.tables:
+            roots = [v for u, v in ((q1, q2), (q2, q1)) if self._tight(table, u, v)]
+            if roots:
+                self._repair(table, roots)
 
-        print('Path does not exist!')
-        return None
\ No newline at end of file
+    def vertex_removed(self, q, neighbors):
+        if self.stale:
+            return
+        if q in self.landmarks:
+            self.stale = True
+            return
+        for table in self.tables:
+            roots = [u for u in neighbors if self._tight(table, q, u)]
+            table.pop(q, None)
+            if roots:
+                self._repair(table, roots)
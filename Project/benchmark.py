@@ -0,0 +1,984 @@
+# benchmark.py
+# ------------
+# micro benchmarks for the planning infrastructure of the ghosts (PRM.py, ghostAgents.py)
+# usage: python benchmark.py <name> (run without a name to list the available benchmarks)
+
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+import layout
+import util
+from PRM import Roadmap, SpatialIndex
+
+
+def random_roadmap(n, degree=10, seed=0):
+    """a roadmap of n uniform points in a 100x100 square, each connected to its degree nearest neighbors"""
+    rng = np.random.RandomState(seed)
+    points = np.round(rng.uniform(0, 100, size=(n, 2)), 3)
+    samples = [tuple(p) for p in points]
+    roadmap = Roadmap(samples)
+    for i, q in enumerate(samples):
+        dists = np.abs(points - points[i]).sum(axis=1)
+        for j in np.argsort(dists)[1:degree + 1]:
+            roadmap.connect(roadmap[q], roadmap[samples[j]])
+    return roadmap, samples
+
+
+def scan_neighbors(roadmap, v):
+    """the old neighbor lookup, scans every edge of the roadmap"""
+    v = roadmap[v]
+    neighbors = []
+    for edge in roadmap.edges:
+        if edge.v1 == v:
+            neighbors.append(edge.v2.q)
+        if edge.v2 == v:
+            neighbors.append(edge.v1.q)
+    return list(set(neighbors))
+
+
+def time_per_call(fn, args_list):
+    start = time.time()
+    for args in args_list:
+        fn(*args)
+    return (time.time() - start) / len(args_list)
+
+
+def benchmark_neighbors(sizes=(250, 500, 1000, 2000, 4000), degree=10, queries=200):
+    """neighbor lookup time as a function of the roadmap size, edge scan vs. the vertex adjacency"""
+    print('%8s %8s %14s %14s %14s' % ('vertices', 'edges', 'scan (us)', 'adjacency (us)', 'dijkstra (ms)'))
+    for n in sizes:
+        roadmap, samples = random_roadmap(n, degree)
+        targets = [(roadmap, random.choice(samples)) for _ in range(queries)]
+        scan = time_per_call(scan_neighbors, targets)
+        adjacency = time_per_call(lambda r, q: r.neighbors(q), targets)
+        pairs = [(random.choice(samples), random.choice(samples)) for _ in range(5)]
+        dijkstra = time_per_call(roadmap.dijkstra, pairs)
+        print('%8d %8d %14.1f %14.1f %14.1f' % (n, len(roadmap.edges), scan * 1e6, adjacency * 1e6, dijkstra * 1e3))
+
+
+def scan_closest_node(roadmap, v):
+    """the old nearest vertex lookup, a linear scan over the vertices"""
+    return min(roadmap.vertices.values(), key=lambda node: roadmap.distance(node.q, v))
+
+
+def benchmark_nearest(sizes=(250, 1000, 4000, 16000), queries=200):
+    """nearest vertex and 20-nearest lookups, linear scan / full sort vs. the spatial index"""
+    print('%8s %14s %14s %14s %14s' % ('vertices', 'scan (us)', 'index (us)', 'sort 20 (us)', 'index 20 (us)'))
+    for n in sizes:
+        roadmap, samples = random_roadmap(n, degree=0)
+        roadmap.index = SpatialIndex(SpatialIndex.cell_size_for(100, 100, n), roadmap.distance)
+        for q in samples:
+            roadmap.index.insert(q)
+        targets = [(roadmap, tuple(np.random.uniform(0, 100, 2))) for _ in range(queries)]
+        scan = time_per_call(scan_closest_node, targets)
+        index = time_per_call(lambda r, q: r.closest_node(q), targets)
+        sort = time_per_call(lambda r, q: sorted(r.vertices, key=lambda x: r.distance(q, x))[:20], targets[:20])
+        k_nearest = time_per_call(lambda r, q: r.k_nearest(q, 20), targets)
+        print('%8d %14.1f %14.1f %14.1f %14.1f' % (n, scan * 1e6, index * 1e6, sort * 1e6, k_nearest * 1e6))
+
+
+def benchmark_prm_build(layout_name='originalClassic', sizes=(300, 1000, 5000), degree=20):
+    """time to construct a PRMGhost (sampling + connecting the roadmap)"""
+    from ghostAgents import PRMGhost
+    lay = layout.getLayout(layout_name)
+    print('%8s %8s %10s' % ('samples', 'edges', 'build (s)'))
+    for n in sizes:
+        start = time.time()
+        ghost = PRMGhost(1, lay, samples=n, degree=degree)
+        print('%8d %8d %10.2f' % (n, len(ghost.prm.edges), time.time() - start))
+
+
+def benchmark_a_star(sizes=(1000, 4000, 16000), degree=10, queries=20):
+    """heap based A* on random roadmaps, the zero heuristic (dijkstra) vs. the default euclidean heuristic"""
+    print('%8s %12s %12s %12s %12s' % ('vertices', 'h=0 exp', 'h=0 (ms)', 'euclid exp', 'euclid (ms)'))
+    for n in sizes:
+        roadmap, samples = random_roadmap(n, degree)
+        pairs = [(random.choice(samples), random.choice(samples)) for _ in range(queries)]
+        zero = [roadmap.a_star(a, b, h=lambda v: 0) for a, b in pairs]
+        euclid = [roadmap.a_star(a, b) for a, b in pairs]
+        print('%8d %12.0f %12.2f %12.0f %12.2f' % (n, np.mean([r.expanded for r in zero]),
+                                                   np.mean([r.time for r in zero]) * 1e3,
+                                                   np.mean([r.expanded for r in euclid]),
+                                                   np.mean([r.time for r in euclid]) * 1e3))
+
+
+def play(layout_name, ghosts, games=1, seed=0, timed_method='getAction'):
+    """
+    plays headless games of a greedy pacman against the given ghosts and times a method of the ghosts
+    (getAction by default, find_next_node to time only the planning).
+    returns the games and a dict ghost index -> [number of calls, total seconds spent in them]
+    """
+    import pacman
+    import pacmanAgents
+    import textDisplay
+    random.seed(seed)
+    np.random.seed(seed)
+    stats = dict((ghost.index, [0, 0.0]) for ghost in ghosts)
+
+    def timed(ghost, method):
+        def timed_method(*args):
+            start = time.time()
+            result = method(*args)
+            stats[ghost.index][0] += 1
+            stats[ghost.index][1] += time.time() - start
+            return result
+        return timed_method
+
+    for ghost in ghosts:
+        setattr(ghost, timed_method, timed(ghost, getattr(ghost, timed_method)))
+    lay = layout.getLayout(layout_name)
+    games = pacman.runGames(lay, pacmanAgents.GreedyAgent(), ghosts, textDisplay.NullGraphics(), games, False)
+    return games, stats
+
+
+def benchmark_shared_tree(layout_name='originalClassic', num_ghosts=4, samples=1000):
+    """ghost planning time with per-ghost searches vs. the shared shortest path tree"""
+    import ghostAgents
+    from PRM import ShortestPathTree
+    roadmap, samples = random_roadmap(4000)
+    searches, shared = [], []
+    for _ in range(20):
+        root = random.choice(samples)
+        starts = random.sample(samples, num_ghosts)
+        start = time.time()
+        for q in starts:
+            roadmap.dijkstra(q, root)
+        searches.append(time.time() - start)
+        start = time.time()
+        tree = ShortestPathTree(roadmap, root)
+        for q in starts:
+            tree.next_hop(q)
+        shared.append(time.time() - start)
+    print('random roadmap of 4000 vertices, %d ghosts per tick: searches %.2f ms/tick, shared tree %.2f ms/tick'
+          % (num_ghosts, np.mean(searches) * 1e3, np.mean(shared) * 1e3))
+    lay = layout.getLayout(layout_name)
+    for ghost_type in ('PRMGhost', 'AStarGhost'):
+        for planner in ('search', 'tree'):
+            ghostAgents.SHARED_ROADMAPS.clear()
+            random.seed(0)
+            ghosts = [getattr(ghostAgents, ghost_type)(i + 1, lay, samples=samples, planner=planner)
+                      for i in range(num_ghosts)]
+            _, stats = play(layout_name, ghosts, timed_method='find_next_node')
+            plans = sum(m for m, _ in stats.values())
+            seconds = sum(t for _, t in stats.values())
+            print('%-10s %-6s plans %5d  ms/plan %7.3f' % (ghost_type, planner, plans, seconds / plans * 1e3))
+
+
+def benchmark_incremental(layouts=('mediumClassic', 'originalClassic'), samples=500, games=3):
+    """vertices expanded per plan over full games, fresh searches vs. the incremental D* Lite ghost"""
+    import ghostAgents
+    print('%-16s %-15s %7s %12s %14s' % ('layout', 'ghost', 'plans', 'expanded', 'expanded/plan'))
+    for layout_name in layouts:
+        lay = layout.getLayout(layout_name)
+        for ghost_type in ('PRMGhost', 'AStarGhost', 'DStarLiteGhost'):
+            random.seed(0)
+            ghost = getattr(ghostAgents, ghost_type)(1, lay, samples=samples)
+            before = ghost.prm.expanded
+            _, stats = play(layout_name, [ghost], games=games, timed_method='find_next_node')
+            plans = stats[1][0]
+            expanded = ghost.prm.expanded - before
+            print('%-16s %-15s %7d %12d %14.1f' % (layout_name, ghost_type, plans, expanded,
+                                                   expanded / float(max(plans, 1))))
+
+
+def deep_size(obj):
+    """bytes held by obj and everything it references (numpy arrays count their buffers)"""
+    seen, stack, size = set(), [obj], 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, np.ndarray) and not obj.flags.owndata:
+            size += obj.nbytes  # getsizeof only counts the buffers arrays own
+        elif isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, '__dict__'):
+            stack.append(obj.__dict__)
+    return size
+
+
+def benchmark_compact(sizes=(10000, 20000), degree=10):
+    """memory and search time of the object Roadmap vs. the array backed CompactRoadmap"""
+    from PRM import CompactRoadmap
+    print('%8s %-15s %10s %12s %14s %12s' % ('vertices', 'roadmap', 'build (s)', 'memory (MB)', 'dijkstra (ms)',
+                                             'a_star (ms)'))
+    for n in sizes:
+        rng = np.random.RandomState(0)
+        samples = [tuple(p) for p in np.round(rng.uniform(0, 100, size=(n, 2)), 3).tolist()]
+        cell_size = SpatialIndex.cell_size_for(100, 100, n)
+        scratch = Roadmap(samples, cell_size)
+        neighbors = dict((q, scratch.k_nearest(q, degree + 1)[1:]) for q in samples)
+        pairs = [(random.choice(samples), random.choice(samples)) for _ in range(10)]
+        for roadmap_type in (Roadmap, CompactRoadmap):
+            start = time.time()
+            roadmap = roadmap_type(samples, cell_size)
+            for q in samples:
+                for w in neighbors[q]:
+                    roadmap.connect(roadmap[q], roadmap[w])
+            if hasattr(roadmap, 'compact'):
+                roadmap.compact()
+            build = time.time() - start
+            roadmap.index = None  # the same in both, don't count it
+            memory = deep_size(roadmap)
+            roadmap.index = scratch.index
+            dijkstra = time_per_call(roadmap.dijkstra, pairs)
+            a_star = time_per_call(roadmap.a_star, pairs)
+            print('%8d %-15s %10.2f %12.1f %14.1f %12.1f' % (n, roadmap_type.__name__, build, memory / 2. ** 20,
+                                                             dijkstra * 1e3, a_star * 1e3))
+
+
+def benchmark_cache(layout_name='originalClassic', sizes=(1000, 5000), degree=20):
+    """time to construct a PRMGhost when its roadmap is built vs. loaded from the roadmap cache"""
+    import shutil
+    import tempfile
+    from ghostAgents import PRMGhost
+    lay = layout.getLayout(layout_name)
+    cache_dir = tempfile.mkdtemp()
+    print('%8s %-8s %10s %12s %14s' % ('samples', 'roadmap', 'build (s)', 'load (ms)', 'entry (KB)'))
+    try:
+        for n in sizes:
+            for roadmap_type in ('objects', 'compact'):
+                start = time.time()
+                PRMGhost(1, lay, samples=n, degree=degree, roadmap_type=roadmap_type, seed=0, cache=True,
+                         cache_dir=cache_dir)
+                build = time.time() - start
+                start = time.time()
+                PRMGhost(1, lay, samples=n, degree=degree, roadmap_type=roadmap_type, seed=0, cache=True,
+                         cache_dir=cache_dir)
+                load = time.time() - start
+                size = sum(os.path.getsize(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir))
+                print('%8d %-8s %10.2f %12.1f %14.1f' % (n, roadmap_type, build, load * 1e3, size / 1024.))
+                shutil.rmtree(cache_dir)
+                os.mkdir(cache_dir)
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def benchmark_growth(layout_name='mediumClassic', games=100, samples=300, every=10):
+    """roadmap size and planning time over many games, unbounded growth vs. the dynamic vertex budget"""
+    import ghostAgents
+    print('%-10s %6s %9s %8s %9s' % ('budget', 'games', 'vertices', 'edges', 'ms/plan'))
+    for budget in (0, 200):
+        random.seed(0)
+        ghost = ghostAgents.PRMGhost(1, layout.getLayout(layout_name), samples=samples, max_dynamic=budget)
+        plans, seconds = 0, 0.0
+        for game in range(1, games + 1):
+            _, stats = play(layout_name, [ghost], seed=game, timed_method='find_next_node')
+            del ghost.find_next_node  # drop the timing wrapper
+            plans, seconds = plans + stats[1][0], seconds + stats[1][1]
+            if game % every == 0:
+                print('%-10s %6d %9d %8d %9.3f' % (budget or 'unbounded', game, len(ghost.prm), len(ghost.prm.edges),
+                                                   seconds / max(plans, 1) * 1e3))
+                plans, seconds = 0, 0.0
+
+
+def benchmark_bidirectional(layouts=('originalClassic', 'bigMaze', 'openClassic'), samples=1000, queries=100):
+    """vertices expanded by point to point queries on the ghosts' roadmaps, one directional vs. bidirectional"""
+    import ghostAgents
+    searches = (('dijkstra', lambda prm, a, b: prm.dijkstra(a, b)),
+                ('bi-dijkstra', lambda prm, a, b: prm.bidirectional_dijkstra(a, b)),
+                ('a_star', lambda prm, a, b: prm.a_star(a, b)),
+                ('bi-a_star', lambda prm, a, b: prm.bidirectional_a_star(a, b)))
+    print('%-16s %-12s %10s %10s' % ('layout', 'search', 'expanded', 'ms/query'))
+    for layout_name in layouts:
+        random.seed(0)
+        prm = ghostAgents.PRMGhost(1, layout.getLayout(layout_name), samples=samples, seed=0).prm
+        connected = [q for q in prm if prm.neighbors(q)]
+        pairs = [tuple(random.sample(connected, 2)) for _ in range(queries)]
+        for name, search in searches:
+            before, start = prm.expanded, time.time()
+            for a, b in pairs:
+                search(prm, a, b)
+            print('%-16s %-12s %10.1f %10.2f' % (layout_name, name, (prm.expanded - before) / float(queries),
+                                                 (time.time() - start) / queries * 1e3))
+
+
+def benchmark_alt(layouts=('bigMaze', 'trickyClassic', 'originalClassic'), samples=1000, queries=100, games=2):
+    """A* with the euclidean vs. the landmark (ALT) heuristic, on random connected vertex pairs and in AStarGhost games"""
+    import ghostAgents
+    print('%-16s %-10s %12s %10s %14s %12s' % ('layout', 'heuristic', 'build (ms)', 'expanded', 'ms/query',
+                                               'game exp/plan'))
+    for layout_name in layouts:
+        lay = layout.getLayout(layout_name)
+        random.seed(0)
+        prm = ghostAgents.PRMGhost(1, lay, samples=samples, seed=0).prm
+        connected = [q for q in prm if prm.neighbors(q)]
+        pairs = [tuple(random.sample(connected, 2)) for _ in range(queries)]
+        start = time.time()
+        landmarks = prm.landmarks()
+        landmarks.build()
+        build = time.time() - start
+        pairs = [(a, b) for a, b in pairs if prm.a_star(a, b).path]  # unreachable pairs search the whole component
+        for heuristic in ('euclidean', 'alt'):
+            h = (lambda b: landmarks.heuristic(b)) if heuristic == 'alt' else (lambda b: None)
+            results = [prm.a_star(a, b, h(b)) for a, b in pairs]
+            ghost = ghostAgents.AStarGhost(1, lay, samples=samples, seed=0, heuristic=heuristic)
+            before = ghost.prm.expanded
+            _, stats = play(layout_name, [ghost], games=games, timed_method='find_next_node')
+            print('%-16s %-10s %12s %10.1f %14.2f %12.1f' % (
+                layout_name, heuristic, '%.1f' % (build * 1e3) if heuristic == 'alt' else '-',
+                np.mean([r.expanded for r in results]), np.mean([r.time for r in results]) * 1e3,
+                (ghost.prm.expanded - before) / float(max(stats[1][0], 1))))
+
+
+def benchmark_lazy(layout_name='originalClassic', sizes=(300, 1000, 3000), games=2):
+    """PRM construction with every candidate edge collision checked vs. lazy PRM, and the cost of lazy checks in games"""
+    import ghostAgents
+    print('%8s %-6s %10s %10s %8s %12s %9s %12s' % ('samples', 'lazy', 'build (s)', 'checks', 'edges', 'game checks',
+                                                    'ms/plan', 'exp/plan'))
+    for n in sizes:
+        for lazy in (False, True):
+            random.seed(0)
+            start = time.time()
+            ghost = ghostAgents.PRMGhost(1, layout.getLayout(layout_name), samples=n, seed=0, lazy=lazy)
+            build, checks, edges = time.time() - start, ghost.collision_checks, len(ghost.prm.edges)
+            before = ghost.prm.expanded
+            _, stats = play(layout_name, [ghost], games=games, timed_method='find_next_node')
+            plans = max(stats[1][0], 1)
+            print('%8d %-6s %10.2f %10d %8d %12d %9.2f %12.1f' % (
+                n, lazy, build, checks, edges, ghost.collision_checks - checks, stats[1][1] / plans * 1e3,
+                (ghost.prm.expanded - before) / float(plans)))
+
+
+def bresenham_collision(walls, start, end):
+    """the old collision check, util.bresenham and the walls Grid one segment at a time"""
+    from math import floor
+    from util import bresenham
+    x1, y1, x2, y2 = int(floor(start[0])), int(floor(start[1])), int(floor(end[0])), int(floor(end[1]))
+    if walls[x1][y1] or walls[x2][y2]:
+        return True
+    return any(walls[x][y] for x, y in bresenham((x1, y1), (x2, y2)))
+
+
+def benchmark_collision(layouts=('originalClassic', 'bigMaze', 'openClassic'), batches=(1, 10, 100, 1000),
+                        segments=20000):
+    """
+    segments checked per second from one point to a batch of random points: the old check, WallRaster.collides
+    (one segment at a time, stops at the first wall) and WallRaster.free (the whole batch in one call)
+    """
+    from collision import WallRaster
+    print('%-16s %6s %8s %14s %14s %14s' % ('layout', 'batch', 'free %', 'old (seg/s)', 'scalar (seg/s)',
+                                            'batched (seg/s)'))
+    for layout_name in layouts:
+        lay = layout.getLayout(layout_name)
+        raster = WallRaster(lay.walls)
+        rng = np.random.RandomState(0)
+        for n in batches:
+            batches_points = [(tuple(rng.uniform(1, (lay.width - 1, lay.height - 1))),
+                               [tuple(q) for q in rng.uniform(1, (lay.width - 1, lay.height - 1), size=(n, 2))])
+                              for _ in range(max(1, segments // n))]
+            checked = len(batches_points) * n
+            old = time_per_call(lambda p, ts: [bresenham_collision(lay.walls, p, q) for q in ts], batches_points)
+            scalar = time_per_call(lambda p, ts: [raster.collides(p, q) for q in ts], batches_points)
+            batched = time_per_call(raster.free, batches_points)
+            free = np.mean(np.concatenate([raster.free(p, ts) for p, ts in batches_points]))
+            print('%-16s %6d %8.1f %14.0f %14.0f %14.0f' % (layout_name, n, free * 100, n / old, n / scalar,
+                                                            n / batched))
+    print('')
+    print('%-16s %8s %10s %10s' % ('layout', 'samples', 'build (s)', 'checks'))
+    for layout_name in layouts:
+        for n in (300, 1000):
+            import ghostAgents
+            random.seed(0)
+            start = time.time()
+            ghost = ghostAgents.PRMGhost(1, layout.getLayout(layout_name), samples=n, seed=0, line_of_sight=False)
+            print('%-16s %8d %10.2f %10d' % (layout_name, n, time.time() - start, ghost.collision_checks))
+
+
+def benchmark_collision_cache(layouts=('originalClassic', 'trickyClassic'), samples=1000, games=3):
+    """
+    the cell pair collision cache shared by the ghosts of a layout (-A collision_cache): PRM builds of 4 ghosts
+    (different seeds) and games of 2 PRM and 2 RRT ghosts, with and without the cache
+    """
+    import collision
+    import ghostAgents
+    print('%-16s %-6s %14s %14s %10s %10s %10s %10s' % ('layout', 'cache', 'build 1st (s)', 'build rest (s)',
+                                                        'build hit', 'ms/plan', 'game hit', 'pairs'))
+    for layout_name in layouts:
+        lay = layout.getLayout(layout_name)
+        for cached in (False, True):
+            collision.CACHES.clear()
+            cache = collision.shared(lay, cached)
+            counts = lambda: (cache.hits, cache.misses) if cached else (0, 0)
+            hit_rate = lambda hits, misses: '%.1f%%' % (hits * 100.0 / max(hits + misses, 1)) if cached else '-'
+            random.seed(0)
+            builds = []
+            for i in range(4):
+                start = time.time()
+                ghostAgents.PRMGhost(1, lay, samples=samples, seed=i, collision_cache=cached, line_of_sight=False)
+                builds.append(time.time() - start)
+            built = counts()
+            ghosts = [ghostAgents.PRMGhost(1, lay, samples=samples, seed=0, collision_cache=cached, line_of_sight=False),
+                      ghostAgents.PRMGhost(2, lay, samples=samples, seed=1, collision_cache=cached, line_of_sight=False),
+                      ghostAgents.RRTGhost(3, lay, collision_cache=cached, line_of_sight=False),
+                      ghostAgents.RRTGhost(4, lay, collision_cache=cached, line_of_sight=False)]
+            before = counts()
+            _, stats = play(layout_name, ghosts, games=games, timed_method='find_next_node')
+            after = counts()
+            plans = sum(calls for calls, _ in stats.values())
+            plan_time = sum(secs for _, secs in stats.values())
+            print('%-16s %-6s %14.2f %14.2f %10s %10.2f %10s %10s' % (
+                layout_name, cached, builds[0], np.mean(builds[1:]), hit_rate(*built), plan_time / max(plans, 1) * 1e3,
+                hit_rate(after[0] - before[0], after[1] - before[1]), len(cache) if cached else '-'))
+
+
+class TimedWalls(object):
+    """forwards the line of sight checks of the ghosts to walls and adds up the time spent in them"""
+
+    def __init__(self, walls):
+        self.walls = walls
+        self.time = 0.0
+
+    def timed(self, method, *args):
+        start = time.time()
+        result = method(*args)
+        self.time += time.time() - start
+        return result
+
+    def collides(self, start, end):
+        return self.timed(self.walls.collides, start, end)
+
+    def free_segments(self, starts, ends):
+        return self.timed(self.walls.free_segments, starts, ends)
+
+    def free(self, p, targets):
+        return self.timed(self.walls.free, p, targets)
+
+
+def benchmark_line_of_sight(layouts=('mediumClassic', 'originalClassic', 'OpenMonster'), samples=1000, games=3):
+    """
+    the one time build of the line of sight bitset of a layout vs. the time the ghosts spend checking for walls on the
+    raster and with the bitset, in the PRM builds and in games of PRM, RRT, RRT step and A* ghosts
+    """
+    import collision
+    import ghostAgents
+    kinds = [lambda i, lay, los: ghostAgents.PRMGhost(i, lay, samples=samples, seed=0, line_of_sight=los),
+             lambda i, lay, los: ghostAgents.RRTGhost(i, lay, line_of_sight=los),
+             lambda i, lay, los: ghostAgents.RRTStepGhost(i, lay, line_of_sight=los),
+             lambda i, lay, los: ghostAgents.AStarGhost(i, lay, samples=samples, seed=1, line_of_sight=los)]
+    print('%-16s %10s %9s %8s %-6s %14s %16s' % ('layout', 'build (s)', 'load (ms)', 'bytes', 'bitset',
+                                                 'prm build (s)', 'game checks (s)'))
+    for layout_name in layouts:
+        lay = layout.getLayout(layout_name)
+        path = lay.lineOfSightPath()
+        if os.path.exists(path):
+            os.remove(path)
+        layout.LINE_OF_SIGHT_CACHE.clear()
+        start = time.time()
+        bits = lay.getLineOfSight()
+        build = time.time() - start
+        layout.LINE_OF_SIGHT_CACHE.clear()
+        start = time.time()
+        lay.getLineOfSight()
+        load = time.time() - start
+        for los in (False, True):
+            walls = TimedWalls(collision.shared(lay, line_of_sight=los))
+            key = lay.contentHash() if los else '\n'.join(lay.layoutText)
+            registry = layout.LINE_OF_SIGHT_CACHE if los else collision.RASTERS
+            registry[key], shared = walls, registry[key]
+            try:
+                ghosts = [kind(i + 1, lay, los) for i, kind in enumerate(kinds[:lay.getNumGhosts()])]
+                prm_build, walls.time = walls.time, 0.0
+                play(layout_name, ghosts, games=games)
+            finally:
+                registry[key] = shared
+            print('%-16s %10s %9s %8s %-6s %14.3f %16.3f' % (
+                layout_name, '%.2f' % build if los else '', '%.1f' % (load * 1e3) if los else '',
+                bits.bits.nbytes if los else '', los, prm_build, walls.time / games))
+
+
+def grid_distances(walls, start):
+    """the number of moves from the cell start to the free cells of walls (a Grid), a breadth first search"""
+    from collections import deque
+    distances = {start: 0}
+    queue = deque([start])
+    while queue:
+        x, y = queue.popleft()
+        for cell in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if cell not in distances and not walls[cell[0]][cell[1]]:
+                distances[cell] = distances[(x, y)] + 1
+                queue.append(cell)
+    return distances
+
+
+def roadmap_queries(ghost, pairs, visible=20):
+    """
+    connects the cell centers of pairs to the closest of their visible nearest roadmap vertices and searches the
+    roadmap between them. returns the share of pairs with a path and the mean ratio of the path cost to the number of
+    moves between the cells
+    """
+    from itertools import islice
+    found, ratios = 0, []
+    for a, b, moves in pairs:
+        ends = []
+        for p in (a, b):
+            ends.append(next((q for q in islice(ghost.prm.by_distance(p), visible) if not ghost.walls.collides(p, q)),
+                             None))
+        if None in ends:
+            continue
+        result = ghost.prm.a_star(ends[0], ends[1])
+        if result.path is not None:
+            found += 1
+            ratios.append((util.manhattanDistance(a, ends[0]) + result.cost + util.manhattanDistance(ends[1], b)) /
+                          max(moves, 1))
+    return found / float(len(pairs)), np.mean(ratios) if ratios else float('nan')
+
+
+def benchmark_samplers(layouts=('originalClassic', 'mediumClassic', 'bigMaze'), sizes=(300, 100, 60), queries=200,
+                       seeds=3):
+    """
+    the roadmaps of the samplers with fewer samples: the share of random pairs of free cells connected through the
+    roadmap and the cost of the path over the number of moves between the cells (lower is better)
+    """
+    import ghostAgents
+    import samplers
+    print('%-16s %-9s %8s %10s %8s %10s %10s' % ('layout', 'sampler', 'samples', 'build (s)', 'edges', 'success',
+                                                 'cost/moves'))
+    for layout_name in layouts:
+        lay = layout.getLayout(layout_name)
+        rng = random.Random(0)
+        cells = [(x, y) for x in range(lay.width) for y in range(lay.height) if not lay.walls[x][y]]
+        pairs = []
+        while len(pairs) < queries:
+            a, b = rng.sample(cells, 2)
+            moves = grid_distances(lay.walls, a).get(b)
+            if moves is not None:
+                pairs.append(((a[0] + 0.5, a[1] + 0.5), (b[0] + 0.5, b[1] + 0.5), moves))
+        for sampler in ['uniform'] + sorted(samplers.SAMPLERS):
+            for n in sizes:
+                builds, edges, success, ratios = [], [], [], []
+                for seed in range(seeds):
+                    start = time.time()
+                    ghost = ghostAgents.PRMGhost(1, lay, samples=n, seed=seed, sampler=sampler)
+                    builds.append(time.time() - start)
+                    edges.append(len(ghost.prm.edges))
+                    rate, ratio = roadmap_queries(ghost, pairs)
+                    success.append(rate)
+                    ratios.append(ratio)
+                ratios = [ratio for ratio in ratios if not np.isnan(ratio)]
+                print('%-16s %-9s %8d %10.2f %8d %9.1f%% %10s' % (layout_name, sampler, n, np.mean(builds),
+                                                                  np.mean(edges), np.mean(success) * 100,
+                                                                  '%.2f' % np.mean(ratios) if ratios else '-'))
+
+
+def benchmark_trace(layouts=('mediumClassic', 'originalClassic'), ghost_types=('PRMGhost', 'RRTGhost'), games=2):
+    """time per ghost move, bytes written and time to replay a ghost's last tick at each trace level (plannerTrace.py)"""
+    import glob
+    import ghostAgents
+    import plannerTrace
+    print('%-16s %-10s %-8s %12s %12s %12s' % ('layout', 'ghost', 'trace', 'move (ms)', 'written (KB)',
+                                               'replay (ms)'))
+    try:
+        for layout_name in layouts:
+            lay = layout.getLayout(layout_name)
+            for ghost_type in ghost_types:
+                for level in plannerTrace.LEVELS:
+                    plannerTrace.configure(level)
+                    random.seed(0)
+                    ghosts = [getattr(ghostAgents, ghost_type)(i, lay) for i in range(1, 3)]
+                    _, stats = play(layout_name, ghosts, games)
+                    plannerTrace.flush()
+                    calls = sum(c for c, _ in stats.values())
+                    seconds = sum(t for _, t in stats.values())
+                    files = glob.glob('trace_ghost_*.pt?')
+                    written = sum(os.path.getsize(name) for name in files)
+                    traced = [g.index for g in ghosts if os.path.exists(plannerTrace.trace_path(g.index))]
+                    replay = '-'
+                    if traced:
+                        start = time.time()
+                        for index in traced:
+                            plannerTrace.replay(index)
+                        replay = '%.1f' % ((time.time() - start) * 1e3 / len(traced))
+                    print('%-16s %-10s %-8s %12.2f %12.1f %12s' % (layout_name, ghost_type, level,
+                                                                   seconds / calls * 1e3, written / 1024., replay))
+                    for name in files:
+                        os.remove(name)
+    finally:
+        plannerTrace.configure('off')
+
+
+class CountedWalls(object):
+    """the collision checks of a ghost (its walls), counting the segments checked"""
+
+    def __init__(self, walls):
+        self.walls = walls
+        self.segments = 0
+
+    def collides(self, start, end):
+        self.segments += 1
+        return self.walls.collides(start, end)
+
+    def free_segments(self, starts, ends):
+        self.segments += len(ends)
+        return self.walls.free_segments(starts, ends)
+
+    def free(self, p, targets):
+        self.segments += len(targets)
+        return self.walls.free(p, targets)
+
+
+def benchmark_rrt_extension(layouts=('mediumClassic', 'originalClassic', 'trickyClassic'),
+                            ghost_types=('RRTGhost', 'RRTStepGhost'), games=2):
+    """
+    segments checked and time per RRT plan when every node is checked for every sample (nearest_first=0) and when
+    the nodes are checked from the closest one until a free one is found, with whether both made the same plans
+    """
+    import ghostAgents
+    print('%-16s %-13s %-13s %8s %14s %10s %6s' % ('layout', 'ghost', 'extension', 'plans', 'checks/plan',
+                                                   'ms/plan', 'same'))
+    for layout_name in layouts:
+        lay = layout.getLayout(layout_name)
+        for ghost_type in ghost_types:
+            plans = {}
+            for nearest_first in (False, True):
+                random.seed(0)
+                ghosts = [getattr(ghostAgents, ghost_type)(i, lay, nearest_first=nearest_first) for i in (1, 2)]
+                made = []
+                for ghost in ghosts:
+                    ghost.walls = CountedWalls(ghost.walls)
+                    ghost.RRT = recorded(ghost.RRT, made)
+                _, stats = play(layout_name, ghosts, games, timed_method='find_next_node')
+                plans[nearest_first] = made
+                calls = sum(c for c, _ in stats.values())
+                seconds = sum(t for _, t in stats.values())
+                checks = sum(ghost.walls.segments for ghost in ghosts)
+                print('%-16s %-13s %-13s %8d %14.0f %10.2f %6s' % (
+                    layout_name, ghost_type, 'nearest first' if nearest_first else 'all nodes', calls,
+                    checks / float(max(calls, 1)), seconds / max(calls, 1) * 1e3,
+                    '' if not nearest_first else plans[False] == plans[True]))
+
+
+def benchmark_rrt_tree(layouts=('mediumClassic', 'originalClassic', 'trickyClassic'),
+                       ghost_types=('RRTGhost', 'RRTStepGhost'), games=2):
+    """the nodes of the RRT plans and the memory of the ghosts' trees (PRM.RRTTree), which every plan reuses"""
+    import ghostAgents
+    print('%-16s %-13s %6s %10s %10s %10s %9s %8s' % ('layout', 'ghost', 'plans', 'nodes/plan', 'max nodes',
+                                                      'ms/plan', 'tree (KB)', 'arrays'))
+    for layout_name in layouts:
+        lay = layout.getLayout(layout_name)
+        for ghost_type in ghost_types:
+            random.seed(0)
+            ghosts = [getattr(ghostAgents, ghost_type)(i, lay) for i in (1, 2)]
+            nodes, arrays = [], set()
+            for ghost in ghosts:
+                def grown(path, ghost=ghost):
+                    nodes.append(len(ghost.tree))
+                    arrays.add(id(ghost.tree.coords))
+                ghost.RRT = recorded(ghost.RRT, [], grown)
+            _, stats = play(layout_name, ghosts, games, timed_method='find_next_node')
+            seconds = sum(t for _, t in stats.values())
+            size = sum(a.nbytes for ghost in ghosts for a in (ghost.tree.coords, ghost.tree.parents, ghost.tree.costs))
+            print('%-16s %-13s %6d %10.1f %10d %10.2f %9.1f %8d' % (layout_name, ghost_type, len(nodes),
+                                                                    np.mean(nodes), max(nodes),
+                                                                    seconds / len(nodes) * 1e3, size / 1024.,
+                                                                    len(arrays)))
+
+
+def benchmark_rrt_reuse(layouts=('mediumClassic', 'originalClassic', 'trickyClassic'),
+                        ghost_types=('RRTGhost', 'RRTStepGhost'), games=3):
+    """
+    samples drawn and time per RRT plan when every plan grows a new tree and when the tree is kept between plans
+    (reuse_tree), the plans that reached pacman, the nodes the plans started from and pacman's average score
+    """
+    import ghostAgents
+    print('%-16s %-13s %-8s %6s %13s %10s %10s %12s %8s' % ('layout', 'ghost', 'tree', 'plans', 'samples/plan',
+                                                           'ms/plan', 'reached %', 'kept nodes', 'score'))
+    for layout_name in layouts:
+        lay = layout.getLayout(layout_name)
+        for ghost_type in ghost_types:
+            for reuse in (False, True):
+                random.seed(0)
+                ghosts = [getattr(ghostAgents, ghost_type)(i, lay, reuse_tree=reuse) for i in (1, 2)]
+                samples, kept, reached = [0], [], [0]
+                for ghost in ghosts:
+                    ghost.sample_point = counted(ghost.sample_point, samples)
+                    watch_plans(ghost, kept, reached)
+                played, stats = play(layout_name, ghosts, games, timed_method='find_next_node')
+                plans = sum(c for c, _ in stats.values())
+                seconds = sum(t for _, t in stats.values())
+                print('%-16s %-13s %-8s %6d %13.1f %10.2f %10.1f %12.1f %8.1f' % (
+                    layout_name, ghost_type, 'reused' if reuse else 'new', plans, samples[0] / float(plans),
+                    seconds / plans * 1e3, 100.0 * reached[0] / plans, np.mean(kept),
+                    np.mean([game.state.getScore() for game in played])))
+
+
+def benchmark_rrt_connect(layouts=('trickyClassic', 'mediumClassic'),
+                          ghost_types=('RRTGhost', 'RRTStepGhost', 'RRTConnectGhost'), queries=300):
+    """
+    plans from and to the same random free cells with every RRT ghost: the plans that reached pacman within
+    max_v_in_tree vertices, the vertices (of both trees for RRT-Connect) of the plans that reached him and the time
+    per plan. the RRT-Connect paths are checked for walls
+    """
+    import ghostAgents
+    print('%-16s %-16s %10s %18s %10s' % ('layout', 'ghost', 'success %', 'vertices/solution', 'ms/plan'))
+    for layout_name in layouts:
+        lay = layout.getLayout(layout_name)
+        rng = random.Random(0)
+        cells = lay.walls.asList(False)
+        pairs = [(rng.choice(cells), rng.choice(cells)) for _ in range(queries)]
+        for ghost_type in ghost_types:
+            random.seed(0)
+            np.random.seed(0)
+            ghost = getattr(ghostAgents, ghost_type)(1, lay)
+            reached, vertices, seconds = 0, [], 0.0
+            for pos, pac_pos in pairs:
+                pos, pac_pos = tuple(map(float, pos)), tuple(map(float, pac_pos))
+                start = time.time()
+                ghost.RRT(pos, pac_pos, ghost.max_v_in_tree)
+                seconds += time.time() - start
+                if ghost.reached:
+                    reached += 1
+                    vertices.append(len(ghost.tree) + len(getattr(ghost, 'goal_tree', ())))
+                    if ghost_type == 'RRTConnectGhost':
+                        path = [pos] + ghost.meeting_path(ghost.meeting)[::-1]
+                        assert path[-1] == pac_pos and not any(ghost.collision(p, q) for p, q in zip(path, path[1:]))
+            print('%-16s %-16s %10.1f %18.1f %10.2f' % (layout_name, ghost_type, 100.0 * reached / queries,
+                                                      np.mean(vertices) if vertices else float('nan'),
+                                                      seconds / queries * 1e3))
+
+
+def benchmark_rrt_star(layouts=('trickyClassic', 'mediumClassic'), iterations=(100, 300, 1000), queries=100,
+                       budgets=(0.005, 0.02, 0.05), games=3):
+    """
+    the length of the paths to pacman of RRTGhost (its first path) and of RRTStarGhost after a number of iterations
+    (no time budget), over the queries every planner solved, then the time per move and the plans per game of the
+    ghosts in games, RRTStarGhost with a few time budgets
+    """
+    import ghostAgents
+    print('%-16s %-22s %10s %10s %10s' % ('layout', 'planner', 'success %', 'path cost', 'ms/plan'))
+    for layout_name in layouts:
+        lay = layout.getLayout(layout_name)
+        rng = random.Random(0)
+        cells = lay.walls.asList(False)
+        pairs = [(tuple(map(float, rng.choice(cells))), tuple(map(float, rng.choice(cells)))) for _ in range(queries)]
+        planners = [('RRTGhost', ghostAgents.RRTGhost(1, lay))]
+        planners += [('RRTStarGhost %d' % n, ghostAgents.RRTStarGhost(1, lay, max_v_in_tree=n, time_budget=0))
+                     for n in iterations]
+        results = []
+        for name, ghost in planners:
+            random.seed(0)
+            np.random.seed(0)
+            costs, seconds = [], 0.0
+            for pos, pac_pos in pairs:
+                start = time.time()
+                ghost.RRT(pos, pac_pos, ghost.max_v_in_tree)
+                seconds += time.time() - start
+                goal = getattr(ghost, 'goal', len(ghost.tree) - 1)
+                costs.append(ghost.tree.costs[goal] + util.euclideanDistance(ghost.tree.point(goal), pac_pos)
+                             if ghost.reached else None)
+            results.append((name, costs, seconds))
+        solved = [i for i in range(queries) if all(costs[i] is not None for _, costs, _ in results)]
+        for name, costs, seconds in results:
+            print('%-16s %-22s %10.1f %10.2f %10.2f' % (layout_name, name,
+                                                        100.0 * sum(c is not None for c in costs) / queries,
+                                                        np.mean([costs[i] for i in solved]), seconds / queries * 1e3))
+    print('')
+    print('%-16s %-22s %10s %10s %12s %8s' % ('layout', 'ghost', 'ms/move', 'ms/plan', 'plans/game', 'score'))
+    for layout_name in layouts:
+        lay = layout.getLayout(layout_name)
+        ghost_types = [('RRTGhost', lambda i: ghostAgents.RRTGhost(i, lay))]
+        ghost_types += [('RRTStarGhost %gs' % budget, lambda i, b=budget: ghostAgents.RRTStarGhost(i, lay, time_budget=b))
+                        for budget in budgets]
+        for name, make in ghost_types:
+            random.seed(0)
+            ghosts = [make(i) for i in (1, 2)]
+            plans = [0]
+            for ghost in ghosts:
+                ghost.RRT = counted(ghost.RRT, plans)
+            played, stats = play(layout_name, ghosts, games)
+            moves = sum(c for c, _ in stats.values())
+            seconds = sum(t for _, t in stats.values())
+            print('%-16s %-22s %10.2f %10.2f %12.1f %8.1f' % (layout_name, name, seconds / moves * 1e3,
+                                                              seconds / max(plans[0], 1) * 1e3,
+                                                              plans[0] / float(games),
+                                                              np.mean([game.state.getScore() for game in played])))
+
+
+def watch_plans(ghost, kept, reached):
+    """appends the size of the tree every plan of an RRT ghost starts from to kept, counts the plans that reached
+    pacman in reached[0]"""
+    start_tree, plan_from = ghost.start_tree, ghost.plan_from
+
+    def started(*args):
+        goal = start_tree(*args)
+        kept.append(len(ghost.tree))
+        return goal
+
+    def planned(pos, goal, max_v):
+        reached[0] += goal is not None
+        return plan_from(pos, goal, max_v)
+    ghost.start_tree, ghost.plan_from = started, planned
+
+
+def recorded(fn, results, callback=None):
+    """fn, appending what it returns to results (and passing it to callback)"""
+    def recording(*args, **kwargs):
+        result = fn(*args, **kwargs)
+        results.append(result)
+        if callback is not None:
+            callback(result)
+        return result
+    return recording
+
+
+def benchmark_live(layout_name='mediumClassic', ghost_types=('PRMGhost', 'RRTStepGhost'), games=2):
+    """time per ghost move with the full trace written to the files only, published with no viewer listening and
+    published to a liveView.py --print viewer running in another process, with the frames sent and dropped"""
+    import subprocess
+    import tempfile
+    import ghostAgents
+    import plannerTrace
+    address = os.path.join(tempfile.gettempdir(), 'pacman_benchmark_live.sock')
+    lay = layout.getLayout(layout_name)
+    print('%-14s %-10s %10s %8s %8s' % ('ghost', 'live', 'move (ms)', 'sent', 'dropped'))
+    try:
+        for ghost_type in ghost_types:
+            for live in ('off', 'no viewer', 'viewer'):
+                viewer = None
+                if live == 'viewer':
+                    with open(os.devnull, 'w') as devnull:
+                        viewer = subprocess.Popen([sys.executable, 'liveView.py', '--print', '--socket', address],
+                                                  stdout=devnull)
+                    while not os.path.exists(address):
+                        time.sleep(0.05)
+                plannerTrace.configure('full', live=address if live != 'off' else None)
+                random.seed(0)
+                ghosts = [getattr(ghostAgents, ghost_type)(i, lay) for i in range(1, 3)]
+                _, stats = play(layout_name, ghosts, games)
+                plannerTrace.flush()
+                publisher = plannerTrace.LIVE
+                if publisher is not None:
+                    while not publisher.frames.empty():  # let the viewer catch up before it's stopped
+                        time.sleep(0.05)
+                calls = sum(c for c, _ in stats.values())
+                seconds = sum(t for _, t in stats.values())
+                print('%-14s %-10s %10.2f %8s %8s' % (ghost_type, live, seconds / calls * 1e3,
+                                                       publisher.sent if publisher else '-',
+                                                       publisher.dropped if publisher else '-'))
+                if viewer is not None:
+                    viewer.send_signal(2)
+                    viewer.wait()
+                for index in range(1, 3):
+                    for path in (plannerTrace.trace_path(index), plannerTrace.index_path(index)):
+                        if os.path.exists(path):
+                            os.remove(path)
+    finally:
+        plannerTrace.configure('off')
+
+
+def benchmark_background(layout_name='originalClassic', sizes=(1000, 5000), num_ghosts=2, games=3):
+    """
+    time until the game starts with the roadmaps built in the constructor vs. in the background, the build time and
+    the moves the ghosts made with the fallback policy while their roadmaps were built
+    """
+    from ghostAgents import PRMGhost
+    lay = layout.getLayout(layout_name)
+    print('%8s %-10s %11s %10s %15s %9s' % ('samples', 'build', 'startup (s)', 'build (s)', 'fallback moves',
+                                            'game (s)'))
+    for n in sizes:
+        for background in (False, True):
+            start = time.time()
+            ghosts = [PRMGhost(i, lay, samples=n, seed=i, background=background) for i in range(1, num_ghosts + 1)]
+            startup = time.time() - start
+            fallback = [0]
+            for ghost in ghosts:
+                if background:
+                    ghost.fallback.getDistribution = counted(ghost.fallback.getDistribution, fallback)
+            start = time.time()
+            play(layout_name, ghosts, games)
+            game = time.time() - start
+            for ghost in ghosts:
+                if background:
+                    ghost.builder.join()
+            print('%8d %-10s %11.2f %10.2f %15d %9.2f' % (n, 'background' if background else 'constructor', startup,
+                                                          max(ghost.build_time for ghost in ghosts), fallback[0],
+                                                          game))
+
+
+def counted(fn, counter):
+    """fn, counting its calls in counter[0]"""
+    def wrapper(*args):
+        counter[0] += 1
+        return fn(*args)
+    return wrapper
+
+
+def roadmap_edges(ghost):
+    """the edges of the roadmap of ghost as a set of point pairs, the order of the edges of a vertex isn't kept"""
+    coords, indptr, indices, _ = ghost.prm.to_arrays()
+    points = [tuple(p) for p in coords.tolist()]
+    indptr, indices = indptr.tolist(), indices.tolist()
+    return set((points[i], points[j]) for i in range(len(points)) for j in indices[indptr[i]:indptr[i + 1]])
+
+
+def benchmark_parallel_build(layout_name='originalClassic', sizes=(5000, 20000), degree=10, workers=(1, 2, 4, 8)):
+    """
+    time to construct a PRMGhost with the nearest neighbors found by 1 to 8 processes, and the share of the serial
+    build spent finding them (the part the workers split, the rest bounds the speedup)
+    """
+    from ghostAgents import PRMGhost
+    lay = layout.getLayout(layout_name)
+    print('%d cpus' % multiprocessing.cpu_count())
+    print('%8s %8s %10s %9s %10s %12s' % ('samples', 'workers', 'build (s)', 'speedup', 'identical', 'neighbors %'))
+    for n in sizes:
+        serial, edges = None, None
+        for w in workers:
+            start = time.time()
+            ghost = PRMGhost(1, lay, samples=n, degree=degree, seed=0, workers=w)
+            build = time.time() - start
+            if serial is None:
+                serial, edges = build, roadmap_edges(ghost)
+                vertices = [v for v in ghost.prm.vertices if not ghost.in_wall(v)]
+                start = time.time()
+                for v in vertices:
+                    ghost.nearest_free(v)
+                share = '%.0f' % (200 * (time.time() - start) / serial)  # establish_edges runs twice in a build
+            print('%8d %8d %10.2f %9.2f %10s %12s' % (n, w, build, serial / build, roadmap_edges(ghost) == edges,
+                                                      share))
+            share = ''
+
+
+BENCHMARKS = {
+    'rrt_star': benchmark_rrt_star,
+    'rrt_connect': benchmark_rrt_connect,
+    'rrt_reuse': benchmark_rrt_reuse,
+    'rrt_tree': benchmark_rrt_tree,
+    'rrt_extension': benchmark_rrt_extension,
+    'live': benchmark_live,
+    'trace': benchmark_trace,
+    'background': benchmark_background,
+    'parallel_build': benchmark_parallel_build,
+    'samplers': benchmark_samplers,
+    'line_of_sight': benchmark_line_of_sight,
+    'collision_cache': benchmark_collision_cache,
+    'collision': benchmark_collision,
+    'lazy': benchmark_lazy,
+    'alt': benchmark_alt,
+    'bidirectional': benchmark_bidirectional,
+    'growth': benchmark_growth,
+    'cache': benchmark_cache,
+    'compact': benchmark_compact,
+    'incremental': benchmark_incremental,
+    'shared_tree': benchmark_shared_tree,
+    'a_star': benchmark_a_star,
+    'neighbors': benchmark_neighbors,
+    'nearest': benchmark_nearest,
+    'prm_build': benchmark_prm_build,
+}
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print('usage: python benchmark.py <%s>' % '|'.join(sorted(BENCHMARKS)))
+        sys.exit(1)
+    random.seed(0)
+    BENCHMARKS[sys.argv[1]]()
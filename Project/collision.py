@@ -0,0 +1,266 @@
+# collision.py
+# ------------
+# line of sight between points of the maze for the planning ghosts (PRMGhost, RRTGhost).
+# a segment collides if a cell of its bresenham line (between the floored end points) is a wall, exactly like
+# util.bresenham, but the walls are kept as a numpy raster so many segments are checked in one vectorized call.
+# the answer only depends on the two cells, so the ghosts of a layout may share a cache of the cell pairs, or use the
+# line of sight between every two cells of the layout, computed once (see shared()).
+
+from math import floor
+
+import numpy as np
+
+SCALAR_BATCH = 24  # smaller batches are checked one segment at a time, see benchmark.py collision
+MAX_PAIRS = 2 ** 17  # the cell pairs a CollisionCache can hold
+RASTERS = {}  # layout text -> the WallRaster of the layout
+CACHES = {}  # layout text -> the CollisionCache of the layout
+
+
+class WallRaster(object):
+    """the walls of a layout as a boolean raster, raster[x, y] is True for a wall"""
+
+    def __init__(self, walls):
+        """
+        :param walls: the walls Grid of a layout (layout.walls)
+        """
+        self.walls = walls.data  # the lists are faster than numpy for a single segment
+        self.raster = np.array(walls.data, dtype=bool)
+        self.flat = self.raster.ravel()
+        self._offsets = None
+
+    def collides(self, start, end):
+        """true if there is a wall on the line between start and end, stops at the first wall"""
+        walls = self.walls
+        x1, y1 = int(floor(start[0])), int(floor(start[1]))
+        x2, y2 = int(floor(end[0])), int(floor(end[1]))
+        if walls[x1][y1] or walls[x2][y2]:
+            return True
+        steep = abs(y2 - y1) > abs(x2 - x1)
+        if steep:
+            x1, y1, x2, y2 = y1, x1, y2, x2
+        if x1 > x2:
+            x1, y1, x2, y2 = x2, y2, x1, y1
+        dx, ady = x2 - x1, abs(y2 - y1)
+        ystep = 1 if y1 < y2 else -1
+        error = dx // 2
+        y = y1
+        for x in xrange(x1, x2 + 1):
+            if (walls[y][x] if steep else walls[x][y]):
+                return True
+            error -= ady
+            if error < 0:
+                y += ystep
+                error += dx
+        return False
+
+    def offsets(self):
+        """
+        the cells of every bresenham line, relative to its first cell, built on first use.
+        a line is walked along its major axis a from the end with the smaller a, as util.bresenham does. for a major
+        axis length dx and a minor one ady, after i steps the error is dx // 2 - i * ady + k * dx for the smallest
+        k >= 0 that keeps it non negative, k is how many times the minor coordinate b moved.
+        row ((steep * 2 + down) * size + dx) * size + ady holds the flat raster offsets of the line, the entries past
+        dx repeat its last cell. steep lines have y as the major axis, down ones decrease b
+        """
+        if self._offsets is None:
+            width, height = self.raster.shape
+            size = max(width, height)
+            dx = np.arange(size)[:, None, None]
+            ady = np.arange(size)[None, :, None]
+            i = np.minimum(np.arange(size)[None, None, :], dx)
+            k = np.maximum(0, -((dx // 2 - i * ady) // np.maximum(dx, 1)))
+            self._offsets = np.array([i * (1 if steep else height) + k * (height if steep else 1) * (-1 if down else 1)
+                                      for steep in (False, True) for down in (False, True)],
+                                     dtype=np.int32).reshape(-1, size)
+        return self._offsets
+
+    def free_segments(self, starts, ends):
+        """
+        a boolean array, True for the segments starts[i] - ends[i] with no wall on them
+        :param starts: n points, or a single point for segments from the same point
+        :param ends: n points
+        """
+        if len(ends) < SCALAR_BATCH:  # the numpy overhead is larger than the lines themselves
+            if len(starts) == 1:
+                starts = [starts[0]] * len(ends)
+            return np.array([not self.collides(p, q) for p, q in zip(starts, ends)], dtype=bool)
+        starts = np.floor(np.asarray(starts, dtype=float)).astype(np.int32).reshape(-1, 2)
+        ends = np.floor(np.asarray(ends, dtype=float)).astype(np.int32).reshape(-1, 2)
+        offsets = self.offsets()
+        size, height = offsets.shape[1], self.raster.shape[1]
+        x1, y1, x2, y2 = starts[:, 0], starts[:, 1], ends[:, 0], ends[:, 1]
+        steep = np.abs(y2 - y1) > np.abs(x2 - x1)
+        major = np.where(steep, y2 - y1, x2 - x1)
+        minor = np.where(steep, x2 - x1, y2 - y1)
+        swap = major < 0  # the line starts at the end point
+        first = np.where(swap, x2 * height + y2, x1 * height + y1)
+        down = np.where(swap, minor > 0, minor < 0)
+        dx = np.abs(major)
+        rows = ((steep * 2 + down) * size + dx) * size + np.abs(minor)
+        cells = offsets[rows, :int(dx.max()) + 1]
+        cells += first[:, None]
+        return ~self.flat.take(cells).any(axis=1)
+
+    def free(self, p, targets):
+        """a boolean array, True for the targets that have no wall on the line from p"""
+        return self.free_segments([p], targets)
+
+
+class CollisionCache(object):
+    """
+    a bounded cache of the collisions of cell pairs in front of a WallRaster, with the same interface.
+    the line between two cells is the same in both directions so a pair is stored once, keyed by its sorted flat cell
+    indices. the cache is set associative, like a cpu cache: a pair can only be in the WAYS slots of the set its hash
+    selects, and a new pair replaces the least recently used pair of its set. that keeps the lookup of a whole batch of
+    segments vectorized (a dict lookup per segment costs more than checking it on the raster).
+    hits and misses count the segments answered from the cache and by the raster
+    """
+    WAYS = 4
+
+    def __init__(self, raster, max_pairs=MAX_PAIRS):
+        """
+        :param raster: the WallRaster of the layout
+        :param max_pairs: the number of cell pairs the cache can hold, rounded up to a power of 2
+        """
+        self.raster = raster
+        self.height = raster.raster.shape[1]
+        self.cells = raster.raster.size
+        self.bits = max(0, int(np.ceil(np.log2(max(int(max_pairs), 1) / float(self.WAYS)))))
+        sets = 2 ** self.bits
+        self.pairs = np.full((sets, self.WAYS), -1, dtype=np.int64)  # -1 is an empty slot
+        self.free_pairs = np.zeros((sets, self.WAYS), dtype=bool)  # no wall between the cells of the pair
+        self.last_used = np.zeros((sets, self.WAYS), dtype=np.int64)  # number of the query that last used the slot
+        self.queries = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return int((self.pairs >= 0).sum())
+
+    def hit_rate(self):
+        return self.hits / float(max(self.hits + self.misses, 1))
+
+    def clear(self):
+        self.pairs.fill(-1)
+
+    def _set(self, pairs):
+        """the set of pairs, a multiplicative (fibonacci) hash"""
+        return ((pairs * 2654435761) & 0xffffffff) >> (32 - self.bits) if self.bits else pairs * 0
+
+    def collides(self, start, end):
+        """true if there is a wall on the line between start and end"""
+        c1 = int(floor(start[0])) * self.height + int(floor(start[1]))
+        c2 = int(floor(end[0])) * self.height + int(floor(end[1]))
+        pair = c1 * self.cells + c2 if c1 < c2 else c2 * self.cells + c1
+        s = self._set(pair)
+        self.queries += 1
+        ways = self.pairs[s].tolist()
+        if pair in ways:
+            way = ways.index(pair)
+            self.hits += 1
+        else:
+            way = int(self.last_used[s].argmin())
+            self.pairs[s, way] = pair
+            self.free_pairs[s, way] = not self.raster.collides(start, end)
+            self.misses += 1
+        self.last_used[s, way] = self.queries
+        return not self.free_pairs[s, way]
+
+    def free_segments(self, starts, ends):
+        """a boolean array, True for the segments starts[i] - ends[i] with no wall on them (see WallRaster)"""
+        if len(ends) == 0:
+            return np.zeros(0, dtype=bool)
+        starts = np.floor(np.asarray(starts, dtype=float)).astype(np.int64).reshape(-1, 2)
+        ends = np.floor(np.asarray(ends, dtype=float)).astype(np.int64).reshape(-1, 2)
+        c1 = starts[:, 0] * self.height + starts[:, 1]
+        c2 = ends[:, 0] * self.height + ends[:, 1]
+        pairs = np.minimum(c1, c2) * self.cells + np.maximum(c1, c2)
+        sets = self._set(pairs)
+        found = self.pairs[sets] == pairs[:, None]
+        hit = found.any(axis=1)
+        # the hits use their slot, the misses replace the least recently used slot of their set
+        ways = np.where(hit, found.argmax(axis=1), self.last_used[sets].argmin(axis=1))
+        free = self.free_pairs[sets, ways]  # read before the misses are stored, two of them may share a slot
+        missing = np.flatnonzero(~hit)
+        if len(missing):
+            starts = starts if len(starts) == len(ends) else np.repeat(starts, len(ends), axis=0)
+            free[missing] = self.raster.free_segments(starts[missing], ends[missing])
+            self.pairs[sets[missing], ways[missing]] = pairs[missing]
+            self.free_pairs[sets[missing], ways[missing]] = free[missing]
+        self.queries += 1
+        self.last_used[sets, ways] = self.queries
+        self.hits += len(pairs) - len(missing)
+        self.misses += len(missing)
+        return free
+
+    def free(self, p, targets):
+        """a boolean array, True for the targets that have no wall on the line from p"""
+        return self.free_segments([p], targets)
+
+
+class LineOfSight(object):
+    """
+    the line of sight between every two cells of a layout as a bitset, with the WallRaster interface: bit c2 of row c1
+    is set if there is no wall on the line between the cells c1 and c2 (flat indices x * height + y), so a check is a
+    single bit test. built by layout.getLineOfSight, which saves it next to the layout file
+    """
+
+    def __init__(self, bits, height):
+        """
+        :param bits: the rows of the bitset, uint8 [cells, ceil(cells / 8)] (numpy.packbits, the first cell in the high
+                     bit of the first byte)
+        :param height: the height of the layout
+        """
+        self.bits = bits
+        self.height = height
+        self.row = bits.shape[1]
+        self.bytes = bytearray(bits.tobytes())  # faster than numpy for a single segment
+
+    @staticmethod
+    def compute(raster):
+        """the bitset of the line of sight on raster (a WallRaster), the lines from every free cell to every cell"""
+        width, height = raster.raster.shape
+        cells = np.array([(x, y) for x in range(width) for y in range(height)])
+        free = np.zeros((len(cells), len(cells)), dtype=bool)
+        for c in np.flatnonzero(~raster.flat):  # the lines that start or end in a wall collide
+            free[c] = raster.free(cells[c], cells)
+        return np.packbits(free, axis=1)
+
+    def collides(self, start, end):
+        """true if there is a wall on the line between start and end"""
+        c1 = int(floor(start[0])) * self.height + int(floor(start[1]))
+        c2 = int(floor(end[0])) * self.height + int(floor(end[1]))
+        return not (self.bytes[c1 * self.row + (c2 >> 3)] >> (7 - (c2 & 7))) & 1
+
+    def free_segments(self, starts, ends):
+        """a boolean array, True for the segments starts[i] - ends[i] with no wall on them"""
+        if len(ends) < SCALAR_BATCH:
+            if len(starts) == 1:
+                starts = [starts[0]] * len(ends)
+            return np.array([not self.collides(p, q) for p, q in zip(starts, ends)], dtype=bool)
+        starts = np.floor(np.asarray(starts, dtype=float)).astype(np.int64).reshape(-1, 2)
+        ends = np.floor(np.asarray(ends, dtype=float)).astype(np.int64).reshape(-1, 2)
+        c1 = starts[:, 0] * self.height + starts[:, 1]
+        c2 = ends[:, 0] * self.height + ends[:, 1]
+        return ((self.bits[c1, c2 >> 3] >> (7 - (c2 & 7))) & 1).astype(bool)
+
+    def free(self, p, targets):
+        """a boolean array, True for the targets that have no wall on the line from p"""
+        return self.free_segments([p], targets)
+
+
+def shared(layout, cache=False, line_of_sight=False):
+    """
+    the line of sight checks of layout, one for all the ghosts (and games) on it: the precomputed LineOfSight bitset of
+    the layout, or its WallRaster with or without a CollisionCache in front of it
+    """
+    if line_of_sight:
+        return layout.getLineOfSight()
+    key = '\n'.join(layout.layoutText)
+    if key not in RASTERS:
+        RASTERS[key] = WallRaster(layout.walls)
+    if not cache:
+        return RASTERS[key]
+    if key not in CACHES:
+        CACHES[key] = CollisionCache(RASTERS[key])
+    return CACHES[key]
@@ -16,10 +16,12 @@ from game import Agent
 from game import Actions
 from game import Directions
 import random
-from util import manhattanDistance, bresenham
+from util import manhattanDistance, euclideanDistance
 import util
 import numpy as np
 import time
+import collision
+import plannerTrace
 
 class GhostAgent(Agent):
     def __init__(self, index, state=None):
@@ -53,8 +55,8 @@ class DirectionalGhost(GhostAgent):
     def __init__(self, index, state=None, prob_attack=0.8, prob_scaredFlee=0.8):
         print("diractionl ghost Index: ", index)
         self.index = index
-        self.prob_attack = prob_attack
-        self.prob_scaredFlee = prob_scaredFlee
+        self.prob_attack = float(prob_attack)
+        self.prob_scaredFlee = float(prob_scaredFlee)
 
     def getDistribution(self, state):
         # Read variables from state
@@ -88,14 +90,46 @@ class DirectionalGhost(GhostAgent):
 
 
 ##### PRM ghost #####
-from PRM import Roadmap
+from PRM import Roadmap, CompactRoadmap, SpatialIndex, MovingTargetDStarLite, RRTTree
+import roadmapCache
+import samplers
 from math import ceil, floor
+from itertools import islice, izip
+import multiprocessing
+import os
+import threading
+
+
+# roadmaps shared by the ghosts that plan on a common roadmap, keyed by the layout and the PRM parameters
+SHARED_ROADMAPS = {}
+BUILD_LOCK = threading.Lock()  # the roadmaps built in the background are built one at a time
+ROADMAP_TYPES = {'objects': Roadmap, 'compact': CompactRoadmap}
+
+
+PARALLEL_MIN_VERTICES = 2000  # smaller roadmaps are built faster than a pool of processes starts
+PARALLEL_CHUNK = 250  # vertices per task of the workers
+BUILDING = None  # the PRMGhost whose roadmap the worker processes are building
+
+
+def nearest_free_chunk(vertices):
+    """the nearest_free of a chunk of vertices and the collision checks it took, in a worker process"""
+    checks = BUILDING.collision_checks
+    neighbors = [BUILDING.nearest_free(v) for v in vertices]
+    return neighbors, BUILDING.collision_checks - checks
+
+
+def as_flag(value):
+    """a boolean ghost argument, from the command line (-A) they come as strings ('1', 'true') or 1 for a bare key"""
+    return value in (True, 1, '1', 'true', 'True')
 
 
 class PRMGhost(GhostAgent):
     """
     A ghost that only know the world via PRM    """
-    def __init__(self, index, layout=None, prob_attack=0.99, prob_scaredFlee=0.99, samples=300, degree=20):
+    def __init__(self, index, layout=None, prob_attack=0.99, prob_scaredFlee=0.99, samples=300, degree=20,
+                 planner='search', roadmap_type='objects', seed=None, cache=False, cache_dir=None, max_dynamic=200,
+                 bidirectional=False, lazy=False, collision_cache=False, line_of_sight=True, sampler='uniform', workers=1,
+                 background=False):
         """
             :param index: ghost index
             :param layout: layout of the game
@@ -103,28 +137,123 @@ class PRMGhost(GhostAgent):
             :param prob_scaredFlee: probability of fleeing from pacman when scared
             :param samples: number of samples to build the PRM
             :param degree: minimal degree for vertex in the PRM
+            :param planner: 'search' - each ghost searches its own roadmap from its position to pacman
+                            'tree' - the ghosts share one roadmap and read their next node from a single shortest
+                            path tree rooted at pacman, computed once per tick
+            :param roadmap_type: 'objects' - a Roadmap of Vertex and Edge objects
+                                 'compact' - an array backed CompactRoadmap, smaller and faster for large roadmaps
+            :param seed: seed of the roadmap sampling, the same seed always gives the same roadmap
+            :param cache: load the roadmap from the on disk roadmap cache (roadmapCache.py), or build and store it there
+            :param cache_dir: directory of the roadmap cache, roadmapCache.CACHE_DIR by default
+            :param max_dynamic: how many of the vertices added while playing (at pacman's positions and after failed
+                                searches) the roadmap keeps, the least recently used on a path are removed first and
+                                the sampled roadmap is never touched. 0 keeps all of them
+            :param bidirectional: search from both the ghost and pacman at once (bidirectional dijkstra, or
+                                  bidirectional A* for the A* ghost), usually expands far fewer vertices
+            :param lazy: lazy PRM - connect the nodes to their nearest neighbors without checking for walls between
+                         them, only the edges on the paths the searches return are checked (once), the ones that go
+                         through a wall are removed and the search is repeated. builds the PRM much faster
+            :param collision_cache: share a cache of the wall checks of cell pairs with the other ghosts on the layout
+                                    (collision.CollisionCache), its hits and misses are counted in self.walls.
+                                    only used with line_of_sight off
+            :param line_of_sight: check for walls with the line of sight between every two cells of the layout,
+                                  computed once and saved next to the layout file (layout.getLineOfSight)
+            :param sampler: where the samples are placed - 'uniform' over the whole layout (the samples in walls are
+                            kept but never connected), or one of samplers.SAMPLERS: 'free' (uniform over the free cells),
+                            'halton', 'sobol' (low discrepancy), 'gaussian' (close to the walls), 'bridge' (in the
+                            corridors). the others need fewer samples for the same roadmap quality
+            :param workers: processes that find the nearest neighbors of the nodes when the PRM is built, for large
+                            roadmaps (PARALLEL_MIN_VERTICES nodes or more). the roadmap is the same for any number
+            :param background: build the roadmap in a background thread so the game starts right away, the ghost
+                               plays like a DirectionalGhost until the roadmap is ready (see ready and build_time)
             *feel free to play with the last two parameters as they have a huge impact on the performance of the PRM*
         """
         GhostAgent.__init__(self, index)
         self.index = index
         self.layout = layout
-        self.degree = degree
+        self.degree = int(degree)
+        self.planner = planner
+        self.roadmap_type = roadmap_type
+        self.seed = int(seed) if seed is not None else None
+        self.rng = random.Random(self.seed) if self.seed is not None else random
+        self.cache = as_flag(cache)
+        self.cache_dir = cache_dir
+        self.max_dynamic = int(max_dynamic)
+        self.bidirectional = as_flag(bidirectional)
+        self.lazy = as_flag(lazy)
+        if sampler != 'uniform' and sampler not in samplers.SAMPLERS:
+            raise ValueError('unknown sampler %r, use uniform or one of %s' % (sampler,
+                                                                              ', '.join(sorted(samplers.SAMPLERS))))
+        self.sampler = sampler
+        self.workers = int(workers)
+        self.collision_checks = 0
+        self.walls = collision.shared(layout, as_flag(collision_cache), as_flag(line_of_sight))
+        self.trace = plannerTrace.Trace(index)
         print("PRM ghost Index: ", index)
         self.start = layout.agentPositions[index][1]
         self.start = (round(self.start[0], 3), round(self.start[1], 3))
         #print(self.start)
-        self.prob_attack = prob_attack
-        self.prob_scaredFlee = prob_scaredFlee
-        self.buildPRM(samples)
-        self.prm.add([self.start])
-        self.establish_edges()
+        self.prob_attack = float(prob_attack)
+        self.prob_scaredFlee = float(prob_scaredFlee)
         self.next_node = self.start
+        self.ready = False  # whether the roadmap is built, the ghost plays like self.fallback until then
+        self.build_time = None  # seconds it took to build (or load) the roadmap
+        if as_flag(background):
+            self.fallback = DirectionalGhost(index, prob_attack=prob_attack, prob_scaredFlee=prob_scaredFlee)
+            self.builder = threading.Thread(target=self.build_roadmap, args=(int(samples),))
+            # not a daemon, the interpreter waits for it on exit rather than tearing the modules down under it
+            self.builder.start()
+        else:
+            self.build_roadmap(int(samples))
+
+    def build_roadmap(self, samples):
+        """get the roadmap of the ghost - share it, load it from the cache or build it, then set ready"""
+        start = time.time()
+        with BUILD_LOCK:  # the ghosts that share a roadmap wait for the first one to build it
+            if self.planner == 'tree' and self.shared_key(samples) in SHARED_ROADMAPS:
+                self.prm = SHARED_ROADMAPS[self.shared_key(samples)]
+                self.add_to_prm(self.start)
+            else:
+                if self.load_cached_prm(samples):
+                    self.add_to_prm(self.start)
+                else:
+                    self.buildPRM(samples)
+                    self.prm.add([self.start])
+                    self.establish_edges()
+                if self.planner == 'tree':
+                    SHARED_ROADMAPS[self.shared_key(samples)] = self.prm
+            self.roadmap_ready()
+        self.trace.attach(self.prm)  # the changes of the roadmap are traced from here on
+        self.build_time = time.time() - start
+        self.ready = True  # set last, getDistribution switches to the roadmap when it sees it
+
+    def roadmap_ready(self):
+        """called once the roadmap is built, before the ghost starts using it"""
+        pass
+
+    def shared_key(self, samples):
+        return '\n'.join(self.layout.layoutText), samples, self.degree, self.roadmap_type, self.lazy, self.sampler
+
+    def cache_key(self, samples):
+        return roadmapCache.cache_key(self.layout, samples, self.degree, self.sampler, self.seed)
+
+    def load_cached_prm(self, num_samples):
+        """load the PRM from the roadmap cache, returns whether it was cached"""
+        if not self.cache or self.lazy:  # lazy roadmaps are cheap to build and aren't cached
+            return False
+        cell_size = SpatialIndex.cell_size_for(self.layout.width, self.layout.height, num_samples)
+        self.prm = roadmapCache.load(self.cache_key(num_samples), ROADMAP_TYPES[self.roadmap_type], cell_size,
+                                     self.cache_dir)
+        return self.prm is not None
 
     def getDistribution(self, state):
         """
         Returns a Counter encoding a distribution over actions from the provided state.
         here is the main function of the PRM ghost that determines the next action to take
         """
+        self.trace.tick()
+        if not self.ready:
+            return self.fallback.getDistribution(state)
         ghost_state = state.getGhostState(self.index)
         legal_actions = state.getLegalActions(self.index)
         pos = state.getGhostPosition(self.index)
@@ -138,8 +267,9 @@ class PRMGhost(GhostAgent):
         # pacman_position = (round(pacman_position[0], 3), round(pacman_position[1], 3))
         pacman_position = (ceil(pacman_position[0]), ceil(pacman_position[1]))
         if self.is_in_node(pos):
-            self.add_to_prm(pacman_position)
+            self.add_to_prm(pacman_position, dynamic=True)
             self.next_node = self.find_next_node(pos, pacman_position)
+            self.bound_prm(pos, pacman_position)
 
         # Select best actions given the state
         distances_to_next_node = [manhattanDistance(pos, self.next_node) for pos in new_positions]
@@ -157,72 +287,166 @@ class PRMGhost(GhostAgent):
         for a in best_actions: dist[a] = best_prob / len(best_actions)
         for a in legal_actions: dist[a] += (1 - best_prob) / len(legal_actions)
         dist.normalize()
-        open('prm_edges_for_ghost_' + str(self.index) + '.txt', 'w').write(str(self.prm.edges))
-        open('prm_vertices_for_ghost_' + str(self.index) + '.txt', 'w').write(str(self.prm.vertices))
         return dist
 
     def find_next_node(self, pos, pacman_position):
-        """find the next node to go to using dijkstra algorithm"""
-        path = self.prm.dijkstra(pos, pacman_position)
+        """find the next node to go to, by searching the PRM or by following the shared shortest path tree"""
+        if self.planner == 'tree':
+            return self.next_node_from_tree(pos, pacman_position)
+        path = self.search(pos, pacman_position)
+        # the searches start from pos through the edges of its closest node, those are the edges to validate
+        while path is not None and self.lazy and \
+                not self.prm.validate_path([self.prm.closest_node(pos).q] + path[1:], self.collision):
+            path = self.search(pos, pacman_position)  # edges on the path went through walls and were removed
         if path is None:
             v = (round(random.uniform(1, self.layout.width - 1), 3), round(random.uniform(1, self.layout.height - 1), 3))
-            self.add_to_prm(v)
+            self.add_to_prm(v, dynamic=True)
             return self.next_node
-        open("PRM_current_path_of"+str(self.index)+".txt", 'w').write(str(path))
+        self.prm.touch(path)
+        self.trace.path(path)
         return path[1]
 
+    def search(self, pos, pacman_position):
+        """a path from pos to pacman using dijkstra algorithm"""
+        if self.bidirectional:
+            # the search has to end at a vertex, the one pacman is at (as in dijkstra's tolerance)
+            goal = self.prm.closest_node(pacman_position)
+            if goal is None or manhattanDistance(goal.q, pacman_position) >= 0.5:
+                return None
+            return self.prm.bidirectional_dijkstra(pos, goal.q).path
+        return self.prm.dijkstra(pos, pacman_position)
+
+    def next_node_from_tree(self, pos, pacman_position):
+        """
+        the next node on the shortest path to pacman, read from the shortest path tree rooted at pacman's vertex.
+        the tree is shared by all the ghosts on this roadmap and only recomputed when pacman's vertex or the roadmap
+        change
+        """
+        here = self.prm.closest_node(pos).q
+        while True:
+            tree = self.prm.shortest_path_tree(self.prm.closest_node(pacman_position).q)
+            next_node = tree.next_hop(here)
+            if next_node is None or not self.lazy or self.prm.validate_path([here] + tree.path(next_node),
+                                                                            self.collision):
+                break
+        if next_node is None:
+            v = (round(random.uniform(1, self.layout.width - 1), 3), round(random.uniform(1, self.layout.height - 1), 3))
+            self.add_to_prm(v, dynamic=True)
+            return self.next_node
+        path = tree.path(next_node)
+        self.prm.touch([here] + path)
+        self.trace.path([pos] + path)
+        return next_node
+
     #### PRM ####
     """ PRM functions """
     def sample_space(self, width, height, n):
-        ''' sample n points uniformly in the space of width x height'''
+        ''' sample n points uniformly in the space of width x height, or with the sampler of the ghost'''
+        if self.sampler != 'uniform':
+            walls = np.array(self.layout.walls.data, dtype=bool)
+            rng = np.random.RandomState(self.rng.randint(0, 2 ** 31 - 1))
+            return [tuple(p) for p in samplers.SAMPLERS[self.sampler](walls, n, rng).tolist()]
         samples = []
         for i in range(n):
-            samples.append((round(random.uniform(1, width - 1), 3), round(random.uniform(1, height - 1),
-                                                                          3)))  # round to 3 decimal places means a tolerance of 0.001
+            samples.append((round(self.rng.uniform(1, width - 1), 3), round(self.rng.uniform(1, height - 1),
+                                                                            3)))  # round to 3 decimal places means a tolerance of 0.001
         return samples
 
     def order_by_distance(self, v):
-        return sorted(self.prm.vertices, key=lambda x: manhattanDistance(v, x))
+        """the vertices of the PRM from the closest to v to the farthest, computed lazily from the spatial index"""
+        return self.prm.by_distance(v)
 
     def establish_edges(self):  # connect each node to some of it's nearest neighbors
-        """ connect the sampled nodes to some of their nearest neighbors as dictated by the degree parameter"""
-        for v in self.prm.vertices:
-            d = self.degree
-            for w in self.order_by_distance(v):
-                if d == 0:
-                    break
-                if not self.collision(v, w):
-                    self.prm.connect(self.prm.vertices[v], self.prm.vertices[w])
-                    d -= 1
+        """
+        connect the sampled nodes to some of their nearest neighbors as dictated by the degree parameter.
+        with workers > 1 the neighbors of the nodes are found by a pool of processes (see nearest_free_chunk) and
+        connected here in the same order, so the roadmap is the same as when it's built by a single process
+        """
+        vertices = [v for v in self.prm.vertices if not self.in_wall(v)]  # a sample inside a wall can't be connected
+        if self.workers > 1 and len(vertices) >= PARALLEL_MIN_VERTICES and hasattr(os, 'fork'):
+            neighbors = self.parallel_nearest_free(vertices)
+        else:
+            neighbors = (self.nearest_free(v) for v in vertices)
+        valid = None if self.lazy else True
+        for v, ws in izip(vertices, neighbors):
+            for w in ws:
+                self.prm.connect(self.prm.vertices[v], self.prm.vertices[w], valid=valid)
+
+    def parallel_nearest_free(self, vertices):
+        """the nearest_free of every vertex, computed by a pool of workers processes"""
+        global BUILDING
+        chunks = [vertices[i:i + PARALLEL_CHUNK] for i in range(0, len(vertices), PARALLEL_CHUNK)]
+        BUILDING = self  # the forked workers inherit the ghost, with its roadmap and walls, without copying them
+        pool = multiprocessing.Pool(self.workers)
+        try:
+            results = pool.map(nearest_free_chunk, chunks)
+        finally:
+            pool.close()
+            pool.join()
+            BUILDING = None
+        for _, checks in results:
+            self.collision_checks += checks
+        return [ws for chunk, _ in results for ws in chunk]
+
+    def connect_to_nearest(self, v):
+        """connect v to the nearest neighbors nearest_free finds for it"""
+        valid = None if self.lazy else True
+        for w in self.nearest_free(v):
+            self.prm.connect(self.prm.vertices[v], self.prm.vertices[w], valid=valid)
+
+    def nearest_free(self, v):
+        """
+        the nearest neighbors of v with no wall between them, degree of them (v itself is one of them if it's a vertex).
+        in lazy mode its degree nearest neighbors that aren't inside a wall, the walls between them are only
+        checked when an edge is on a path (see find_next_node)
+        """
+        d = self.degree
+        if self.lazy:
+            return list(islice((w for w in self.order_by_distance(v) if not self.in_wall(w)), d))
+        # the candidates are checked in batches from the closest, the first one as large as the missing edges and
+        # each one twice the size of the previous one
+        candidates = self.order_by_distance(v)
+        neighbors = []
+        batch = d
+        while len(neighbors) < d:
+            ws = list(islice(candidates, batch))
+            if not ws:
+                break
+            self.collision_checks += len(ws)
+            neighbors.extend(w for w, free in izip(ws, self.walls.free(v, ws)) if free)
+            batch *= 2
+        return neighbors[:d]
 
     def buildPRM(self, num_samples):
         """build the PRM with num_samples samples"""
         samples = self.sample_space(self.layout.width, self.layout.height, num_samples)
         #print("samples: ", samples)
-        self.prm = Roadmap(samples)
+        cell_size = SpatialIndex.cell_size_for(self.layout.width, self.layout.height, num_samples)
+        self.prm = ROADMAP_TYPES[self.roadmap_type](samples, cell_size)
         #print("prm: ", self.prm.vertices)
         #print(self.prm.vertices[samples[0]].edges)
         self.establish_edges()
-        # save prm edges to a file to view
-        with open('prm_edges_for_ghost_' + str(self.index) + '.txt', 'w') as f:
-            f.write(str(self.prm.edges))
+        if self.roadmap_type == 'compact':
+            self.prm.compact()
+        if self.cache and not self.lazy:
+            roadmapCache.store(self.cache_key(num_samples), self.prm, self.cache_dir)
 
-    def add_to_prm(self, v,):
+    def add_to_prm(self, v, dynamic=False):
         """
         check whether we should add a node to the PRM and if so add it
         In order to avoid adding too many nodes (slows the game) we only add a node it if's far enough from the
-        closest node or if they have a wall between them"""
+        closest node or if they have a wall between them.
+        a dynamic node (added while playing) may later be removed by bound_prm"""
         v = (round(v[0], 3), round(v[1], 3))
-        self.prm.add([v])
-        neighbors = self.order_by_distance(v)
-        d = self.degree
-        for w in neighbors:
-            if d == 0:
-                break
-            if not self.collision(v, w):
-                # print("adding edge: ", v, w)
-                self.prm.connect(self.prm.vertices[v], self.prm.vertices[w])
-                d -= 1
+        if self.prm.add([v]) and dynamic:
+            self.prm.add_dynamic(v)
+        self.connect_to_nearest(v)
+
+    def bound_prm(self, pos, pacman_position):
+        """remove the least recently used dynamic nodes above the max_dynamic budget, but not the ones we're using"""
+        if self.max_dynamic > 0 and len(self.prm.dynamic) > self.max_dynamic:
+            keep = set([self.next_node, self.prm.closest_node(pos).q, self.prm.closest_node(pacman_position).q])
+            self.prm.evict_dynamic(self.max_dynamic, keep)
 
     def not_wall(self, (x, y)):
         """it's probably not a wall"""
@@ -234,45 +458,25 @@ class PRMGhost(GhostAgent):
     def is_in_node(self, v, tolerance=1):
         """check if a vertex is in a node"""
         x, y = round(v[0], 3), round(v[1], 3)
-        xs = map(lambda x: round(x[0], 3), self.prm.vertices.keys())
-        ys = map(lambda x: round(x[1], 3), self.prm.vertices.keys())
-        for i in range(len(xs)):
-            if manhattanDistance((x, y), (xs[i], ys[i])) < tolerance:
-                return True
-        return False
+        nearest = self.prm.index.nearest((x, y))
+        return nearest is not None and nearest[0] < tolerance
+
+    def in_wall(self, (x, y)):
+        return self.layout.walls[int(floor(x))][int(floor(y))]
 
     def collision(self, start, end):
         """
         Returns true if there is a wall between two points in the maze, not as trivial as we hoped :(
         """
-        walls = self.layout.walls
-        x1, y1 = start
-        x2, y2 = end
-        x1 = int(floor(x1))
-        x2 = int(floor(x2))
-        y1 = int(floor(y1))
-        y2 = int(floor(y2))
-
-        if walls[x1][y1] or walls[x2][y2]:
-            return True
-
-        p1 = (x1, y1)
-        p2 = (x2, y2)
-        line_pix = bresenham(p1, p2)
-
-        for p in line_pix:
-            (x, y) = p
-            if walls[x][y]:
-                return True
-
-        return False
+        self.collision_checks += 1
+        return self.walls.collides(start, end)
 
 
 #### Flank ghost ####
 '''A ghost that tries to flank pacman'''
 class FlankGhost(PRMGhost):
 
-    def __init__(self, index, state=None, prob_attack=0.99, prob_scaredFlee=0.99, samples=300, degree=20):
+    def __init__(self, index, state=None, prob_attack=0.99, prob_scaredFlee=0.99, samples=300, degree=20, **kwargs):
         """
             :param index: ghost index
             :param layout: layout of the game
@@ -280,15 +484,20 @@ class FlankGhost(PRMGhost):
             :param prob_scaredFlee: probability of fleeing from pacman when scared
             :param samples: number of samples to build the PRM
             :param degree: minimal degree for vertex in the PRM
+            :param kwargs: the planning options of PRMGhost (planner, roadmap_type, seed, cache, max_dynamic, ...)
             *feel free to play with the last two parameters as they have a huge impact on the performance of the PRM*
         """
-        PRMGhost.__init__(self, index, state, prob_attack, prob_scaredFlee, samples, degree)
+        PRMGhost.__init__(self, index, state, prob_attack, prob_scaredFlee, samples, degree, **kwargs)
         self.prevpacman = state.agentPositions[0][1]
     def getDistribution(self, state):
         """
         Returns a Counter encoding a distribution over actions from the provided state.
         modified from the original getDistribution function in PRMGhost class to estimate the next position of pacman
         """
+        self.trace.tick()
+        if not self.ready:
+            self.update_prevpacman(state)
+            return self.fallback.getDistribution(state)
         other_locations = []
         for agent in range(1, len(state.data.agentStates)):
             if agent != self.index:
@@ -309,7 +518,7 @@ class FlankGhost(PRMGhost):
                            pacman_position[1] if floor(pacman_position[1]) > 0 else 1)
 
         if self.is_in_node(pos):
-            self.add_to_prm(pacman_position)
+            self.add_to_prm(pacman_position, dynamic=True)
             if (pacman_position[0] + 10 * (pacman_position[0] - self.prevpacman[0])) < self.layout.width and (
                     pacman_position[0] + 10 * (pacman_position[0] - self.prevpacman[0])) > 0:
                 next_x = pacman_position[0] + 10 * (pacman_position[0] - self.prevpacman[0])
@@ -322,6 +531,7 @@ class FlankGhost(PRMGhost):
                 next_y = pacman_position[1]
 
             self.next_node = self.find_next_node(pos, (next_x, next_y))
+            self.bound_prm(pos, pacman_position)
 
         # Select best actions given the state
         distances_to_next_node = [manhattanDistance(pos, self.next_node) for pos in new_positions]
@@ -339,8 +549,6 @@ class FlankGhost(PRMGhost):
         for a in best_actions: dist[a] = best_prob / len(best_actions)
         for a in legal_actions: dist[a] += (1 - best_prob) / len(legal_actions)
         dist.normalize()
-        open('prm_edges_for_ghost_' + str(self.index) + '.txt', 'w').write(str(self.prm.edges))
-        open('prm_vertices_for_ghost_' + str(self.index) + '.txt', 'w').write(str(self.prm.vertices))
         self.update_prevpacman(state)
         return dist
 
@@ -354,7 +562,8 @@ class FlankGhost(PRMGhost):
 '''A ghost that uses A* to find the shortest path to pacman'''
 class AStarGhost(PRMGhost):
 
-    def __init__(self, index, state=None, prob_attack=0.99, prob_scaredFlee=0.99, samples=300, degree=20):
+    def __init__(self, index, state=None, prob_attack=0.99, prob_scaredFlee=0.99, samples=300, degree=20,
+                 heuristic='euclidean', landmarks=8, **kwargs):
         """
             :param index: ghost index
             :param layout: layout of the game
@@ -362,19 +571,57 @@ class AStarGhost(PRMGhost):
             :param prob_scaredFlee: probability of fleeing from pacman when scared
             :param samples: number of samples to build the PRM
             :param degree: minimal degree for vertex in the PRM
+            :param heuristic: 'euclidean' - the straight line distance to pacman
+                              'alt' - lower bounds from the roadmap distances to a few landmark vertices (see
+                              Landmarks in PRM.py), much tighter in mazes where the way around the walls is long
+            :param landmarks: number of landmarks for the 'alt' heuristic
+            :param kwargs: the planning options of PRMGhost (planner, roadmap_type, seed, cache, max_dynamic, ...)
             *feel free to play with the last two parameters as they have a huge impact on the performance of the PRM*
         """
-        PRMGhost.__init__(self, index, state, prob_attack, prob_scaredFlee, samples, degree)
+        PRMGhost.__init__(self, index, state, prob_attack, prob_scaredFlee, samples, degree, **kwargs)
+        self.heuristic = heuristic
+        self.num_landmarks = int(landmarks)
+        self.last_search = None  # the SearchResult of the last A* query, for stats
+
+    def search(self, pos, pacman_position):
+        """ a path from pos to pacman using A* instead of dijkstra as in the simple PRM ghost"""
+        landmarks = self.prm.landmarks(self.num_landmarks) if self.heuristic == 'alt' else None
+        if self.bidirectional:
+            h = landmarks.lower_bound if landmarks else euclideanDistance
+            self.last_search = self.prm.bidirectional_a_star(pos, pacman_position, h)
+        else:
+            h = landmarks.heuristic(pacman_position) if landmarks else None
+            self.last_search = self.prm.a_star(pos, pacman_position, h)
+        return self.last_search.path
 
-    def find_next_node(self, pos, pacman_position):
-        """ find the next node to go to using A* instead of dijkstra as in the simple PRM ghost"""
-        path = self.prm.a_star(pos, pacman_position)
+
+#### D* Lite ghost ####
+'''A ghost that keeps its search between plans and only repairs it as pacman moves and the PRM grows'''
+class DStarLiteGhost(PRMGhost):
+
+    def __init__(self, index, state=None, prob_attack=0.99, prob_scaredFlee=0.99, samples=300, degree=20, **kwargs):
+        """
+            :param index: ghost index
+            :param layout: layout of the game
+            :param prob_attack: probability of attacking pacman when not scared
+            :param prob_scaredFlee: probability of fleeing from pacman when scared
+            :param samples: number of samples to build the PRM
+            :param degree: minimal degree for vertex in the PRM
+            :param kwargs: the planning options of PRMGhost (planner, roadmap_type, seed, cache, max_dynamic, ...)
+            *feel free to play with the last two parameters as they have a huge impact on the performance of the PRM*
+        """
+        self.engine = None
+        PRMGhost.__init__(self, index, state, prob_attack, prob_scaredFlee, samples, degree, **kwargs)
+
+    def roadmap_ready(self):
+        self.engine = MovingTargetDStarLite(self.prm)
+
+    def search(self, pos, pacman_position):
+        """ a path from pos to pacman from the incremental moving target D* Lite search"""
+        path = self.engine.plan(self.prm.closest_node(pos).q, self.prm.closest_node(pacman_position).q)
         if path is None:
-            v = (round(random.uniform(1, self.layout.width - 1), 3), round(random.uniform(1, self.layout.height - 1), 3))
-            self.add_to_prm(v)
-            return self.next_node
-        open("PRM_current_path_of"+str(self.index)+".txt", 'w').write(str(path))
-        return path[1]
+            return None
+        return [pos] + (path[1:] or path)
 
 
 class GridGhost(GhostAgent):
@@ -395,15 +642,16 @@ class GridGhost(GhostAgent):
         self.layout = layout
         self.start = layout.agentPositions[index][1]
         #print(self.start)
-        self.prob_attack = prob_attack
-        self.prob_flee = prob_flee
+        self.prob_attack = float(prob_attack)
+        self.prob_flee = float(prob_flee)
         self.grid_size = None
         self.grid = None
         self.width = None
         self.height = None
         self.pp = (0,0)
         self.mp = (0,0)
-        self.build_grid(grid_size)
+        self.trace = plannerTrace.Trace(index)
+        self.build_grid(int(grid_size))
         self.next_tile = [self.position_to_grid(self.start)[0], self.position_to_grid(self.start)[1]]
         #open('grids_for_ghost_' + str(self.index) + '.txt', 'w').write((str((self.layout.width,self.layout.height))))
 
@@ -411,6 +659,7 @@ class GridGhost(GhostAgent):
         """ Returns a Counter encoding a distribution over actions from the provided state.
         after converting the state to a grid, the ghost will use the grid to find the best path to the tile where pacman is
         """
+        self.trace.tick()
         ghost_state = state.getGhostState(self.index)
         legal_actions = state.getLegalActions(self.index)
         pos = state.getGhostPosition(self.index)
@@ -467,10 +716,7 @@ class GridGhost(GhostAgent):
                         if self.layout.isWall((m, n)):
                             self.grid[i, j] = False
         """
-        open('grids_for_ghost_' + str(self.index) + '.txt', 'a').write('\n'.join([' '.join(['{:1}'.format(item)
-                                    for item in row])
-                                    for row in reversed(np.transpose(self.grid))]))
-        open('grids_for_ghost_' + str(self.index) + '.txt', 'a').write('\n\n')
+        self.trace.grid(self.grid)
         # self.print_grid()
 
     def find_next_tile(self, pos, pacman_position):     # Call dfs on the grid to find the next tile to move to
@@ -537,7 +783,8 @@ class RRTGhost(GhostAgent):
     """
     A ghost that only know the world via RRT    """
 
-    def __init__(self, index, layout=None, prob_attack=0.99, prob_scaredFlee=0.99, goal_prob=0.05, step_size=1, max_v_in_tree=300):
+    def __init__(self, index, layout=None, prob_attack=0.99, prob_scaredFlee=0.99, goal_prob=0.05, step_size=1, max_v_in_tree=300,
+                 collision_cache=False, line_of_sight=True, nearest_first=False, reuse_tree=False):
         """
         :param index: index of the ghost
         :param layout: layout of the game
@@ -546,6 +793,17 @@ class RRTGhost(GhostAgent):
         :param goal_prob: probability of reaching the goal
         :param step_size: step size of the RRT, distance between node and parent
         :param max_v_in_tree: maximum number of vertices in the tree before taking action
+        :param collision_cache: share a cache of the wall checks of cell pairs with the other ghosts on the layout
+                                (only used with line_of_sight off)
+        :param line_of_sight: check for walls with the line of sight between every two cells of the layout, computed
+                              once and saved next to the layout file (layout.getLineOfSight)
+        :param nearest_first: extend the tree from the closest free node by checking the nodes from the closest one (in
+                              a SpatialIndex of the tree) and stopping at the first free one, instead of checking all
+                              of them in a batch. the trees are the same either way, it checks a few times fewer
+                              segments but the batch is a single vectorized call, so it only pays off when a check is
+                              expensive (see benchmark.py rrt_extension)
+        :param reuse_tree: keep the tree between plans, a plan starts from the subtree of the node the ghost reached
+                           and only grows it if no node of it is close to pacman
         *feel free to play with the last two parameters as they have a huge impact on the performance of the RRT*
         """
         GhostAgent.__init__(self, index)
@@ -555,13 +813,22 @@ class RRTGhost(GhostAgent):
         self.start = layout.agentPositions[index][1]
         self.start = (round(self.start[0], 3), round(self.start[1], 3))
         #print(self.start)
-        self.prob_attack = prob_attack
-        self.prob_scaredFlee = prob_scaredFlee
-        self.goal_prob = goal_prob
-        self.step_size = step_size
+        self.prob_attack = float(prob_attack)
+        self.prob_scaredFlee = float(prob_scaredFlee)
+        self.goal_prob = float(goal_prob)
+        self.step_size = float(step_size)
         self.next_node = self.start
-        self.max_v_in_tree = max_v_in_tree
-        open('rrt_tree_for_ghost_' + str(self.index) + '.txt', 'w').write('')
+        self.max_v_in_tree = int(max_v_in_tree)
+        self.walls = collision.shared(layout, as_flag(collision_cache), as_flag(line_of_sight))
+        self.nearest_first = as_flag(nearest_first)
+        # the tree every plan is grown in, most samples are away from the tree so its SpatialIndex (for nearest_first)
+        # has bigger cells than usual to skip the empty ones faster
+        cell_size = SpatialIndex.cell_size_for(layout.width, layout.height, self.max_v_in_tree + 1, per_cell=8)
+        self.tree = RRTTree(self.max_v_in_tree + 1, cell_size if self.nearest_first else None)
+        self.reuse_tree = as_flag(reuse_tree)
+        self.next_row = None  # the row of next_node in the tree, if the next plan can start from it
+        self.reached = False  # whether the last plan reached pacman
+        self.trace = plannerTrace.Trace(index)
 
     def getDistribution(self, state):
         """
@@ -569,6 +836,7 @@ class RRTGhost(GhostAgent):
         build RRT with a cap on the number of vertices in the tree (max_v_in_tree)
         and take action towards the next node in the tree on the path to pacman
         """
+        self.trace.tick()
         ghost_state = state.getGhostState(self.index)
         legal_actions = state.getLegalActions(self.index)
         pos = state.getGhostPosition(self.index)
@@ -610,36 +878,73 @@ class RRTGhost(GhostAgent):
         return path
 
     def RRT(self, pos, pac_pos, max_v=300): # gets a two points and the maximum number of vertices to compute and runs RRT
-        goal_reached = False
-        trre = [(pos, 0)] # list of Tree points and their father node in the graph
+        tree = self.tree
+        goal = self.start_tree(pos, pac_pos, 2)
         counter = max_v # maximum number of point to expand
-        while (not goal_reached) and counter:
+        while goal is None and counter and len(tree) <= max_v:
             counter -= 1
             point = self.sample_point(self.layout.width, self.layout.height, pac_pos, self.goal_prob)
-            min_dis = 999999
-            father = None
-            for v in trre:
-                if not self.collision(v[0], point):
-                    if manhattanDistance(v[0], point) <= min_dis:
-                        min_dis = manhattanDistance(v[0], point)
-                        father = trre.index(v)
-            open('rrt_tree_for_ghost_' + str(self.index) + '.txt', 'a').write(str(trre))
-            open('rrt_tree_for_ghost_' + str(self.index) + '.txt', 'a').write('\n')
+            if self.nearest_first:
+                father = self.nearest_free_first(tree, point, lambda i: not self.walls.collides(tree.coords[i], point))
+            else:
+                father = tree.nearest(point, self.walls.free(point, tree.points))
             if father is not None:
-                trre.append((point, father))
+                row = tree.add(point, father)
                 if manhattanDistance(point, pac_pos) < 2:
-                    goal_reached = True
-        path = []
-        p = trre[-1]
-        while p[0] != pos:
-            path.append(p[0])
-            p = trre[p[1]]
+                    goal = row
+        return self.plan_from(pos, goal, max_v)
+
+    def start_tree(self, pos, pac_pos, tolerance):
+        """
+        start the tree of a plan at pos, or with reuse_tree at the node the ghost reached (keeping the subtree of the
+        node). returns the row of a kept node closer than tolerance to pacman if there is one, the plan's goal
+        """
+        tree = self.tree
+        if not self.reuse_tree or self.next_row is None:
+            tree.reset(pos)
+            return None
+        tree.reroot(self.next_row)
+        goal = tree.nearest(pac_pos)
+        if goal == 0 or manhattanDistance(tree.point(goal), pac_pos) >= tolerance:
+            return None
+        return goal
+
+    def plan_from(self, pos, goal, max_v):
+        """
+        the next node on the branch of the tree to goal (to the newest node if pacman wasn't reached), or None if it's
+        the root. the next plan may start from it unless the tree is full
+        """
+        tree = self.tree
+        rows = tree.branch(len(tree) - 1 if goal is None else goal)
+        path = [tree.point(row) for row in rows]
+        self.trace_plan(tree, pos, path)
+        self.next_row = rows[-1] if rows and (goal is not None or len(tree) <= max_v) else None
+        self.reached = goal is not None
 
         if len(path) is 0:
             return None
 
         return path[-1]
 
+    def trace_plan(self, tree, pos, path):
+        """trace the tree of a plan and the path on it, from pos"""
+        if not self.trace.enabled():
+            return
+        self.trace.tree(tree.points, tree.parents[:len(tree)])
+        self.trace.path([pos] + path[::-1])
+
+    def nearest_free_first(self, tree, point, free):
+        """
+        the same node as tree.nearest with the free nodes, but the nodes are checked one at a time from the closest one
+        (the newest of the ties first) and the search stops at the first free one.
+        :param tree: an RRTTree with a SpatialIndex
+        :param free: free(i) is true if the tree may grow from node i
+        """
+        for _, _, i in tree.index.iter_nearest(point, newest_first=True):
+            if free(i):
+                return i
+        return None
+
     def out_of_bounds(self, point): # checks if a point is out of the map (might happen because of the step size)
         x, y = point[0], point[1]
         if 0 <= x < self.layout.width and 0 <= y < self.layout.height:
@@ -680,27 +985,7 @@ class RRTGhost(GhostAgent):
         """
         Returns true if there is a wall between two points in the maze, not as trivial as we hoped :(
         """
-        walls = self.layout.walls
-        x1, y1 = start
-        x2, y2 = end
-        x1 = int(floor(x1))
-        x2 = int(floor(x2))
-        y1 = int(floor(y1))
-        y2 = int(floor(y2))
-
-        if walls[x1][y1] or walls[x2][y2]:
-            return True
-
-        p1 = (x1, y1)
-        p2 = (x2, y2)
-        line_pix = bresenham(p1, p2)
-
-        for p in line_pix:
-            (x, y) = p
-            if walls[x][y]:
-                return True
-
-        return False
+        return self.walls.collides(start, end)
 
 
 class RRTStepGhost(RRTGhost):
@@ -708,38 +993,217 @@ class RRTStepGhost(RRTGhost):
     A ghost that only know the world via RRT with fixed step size """
 
     def RRT(self, pos, pac_pos, max_v=500, step_size=1): # gets a two points and the maximum number of vertices to compute and runs RRT
-        goal_reached = False
-        trre = [(pos, 0)]
+        tree = self.tree
+        goal = self.start_tree(pos, pac_pos, 1.5)
         counter = max_v
-        step_point = None
-        while not goal_reached and counter:
+        while goal is None and counter and len(tree) <= max_v:
             counter -= 1
             point = self.sample_point(self.layout.width, self.layout.height, pac_pos, self.goal_prob)
-            min_dis = 999999
-            father = None
-            for v in trre:
-                p2 = self.step_vector(v[0], point, step_size)
-                if self.out_of_bounds(p2):
-                    p2 = point
-                if not self.collision(v[0], p2):
-                    if manhattanDistance(v[0], point) <= min_dis:
-                        min_dis = manhattanDistance(v[0], point)
-                        father = trre.index(v)
-                        step_point = p2
+            if self.nearest_first:
+                steps = {}
+                father = self.nearest_free_first(tree, point, lambda i: self.step_free(tree.coords[i], point,
+                                                                                        step_size, steps, i))
+            else:
+                steps = self.steps(tree.points, point, step_size)
+                father = tree.nearest(point, self.walls.free_segments(tree.points, steps))
             if father is not None:
-                trre.append((step_point, father))
+                step_point = steps[father]
+                row = tree.add(step_point, father)
                 if manhattanDistance(step_point, pac_pos) < 1.5:
-                    goal_reached = True
-        open('rrt_tree_for_ghost_' + str(self.index) + '.txt', 'a').write(str(trre))
-        open('rrt_tree_for_ghost_' + str(self.index) + '.txt', 'a').write('\n')
+                    goal = row
         # print("rrt tree")
-        path = []
-        p = trre[-1]
-        while p[0] != pos:
-            path.append(p[0])
-            p = trre[p[1]]
-        open('rrt_current_path_for_ghost_'+str(self.index)+'.txt','w').write(str(path))
+        return self.plan_from(pos, goal, max_v)
+
+    def step(self, v, point, step_size):
+        """the point a step from v towards point, or point itself if the step leaves the map"""
+        p2 = self.step_vector(v, point, step_size)
+        if self.out_of_bounds(p2):
+            p2 = point
+        return p2
+
+    def steps(self, points, point, step_size):
+        """step from every one of points (an [n, 2] array) towards point at once"""
+        point = np.asarray(point, dtype=float)
+        vectors = point - points
+        with np.errstate(divide='ignore', invalid='ignore'):  # a node at point steps nowhere, it's replaced below
+            steps = points + vectors / np.sqrt((vectors * vectors).sum(axis=1))[:, None] * step_size
+            inside = (0 <= steps) & (steps < (self.layout.width, self.layout.height))
+        steps[~inside.all(axis=1)] = point
+        return steps
+
+    def step_free(self, v, point, step_size, steps, i):
+        """true if the step from node i (at v) towards point has no wall on it, the step is kept in steps[i]"""
+        steps[i] = self.step(v, point, step_size)
+        return not self.walls.collides(v, steps[i])
+
+
+class RRTConnectGhost(RRTStepGhost):
+    """
+    A ghost that only know the world via RRT-Connect: a tree grows from the ghost and another from pacman, every
+    iteration one of them takes a step towards a sample and the other one greedily steps towards the new node until
+    it reaches it or hits a wall, then they swap. the plan is the path through both trees once they meet.
+    as in RRTStepGhost the trees grow from the closest node the step is free from, and they are grown from scratch
+    for every plan (reuse_tree and nearest_first aren't used)
+    """
+
+    def __init__(self, index, layout=None, step_size=2, **kwargs):
+        """
+        :param step_size: the length of a step of the trees, the greedy connections spend the max_v_in_tree vertices
+                          quickly with shorter steps (see benchmark.py rrt_connect)
+        """
+        RRTStepGhost.__init__(self, index, layout, step_size=step_size, **kwargs)
+        self.goal_tree = RRTTree(self.max_v_in_tree + 1)
+        self.meeting = None  # the rows of the node where the trees met in the last plan, in the ghost's and pacman's trees
+
+    def RRT(self, pos, pac_pos, max_v=300): # gets a two points and the maximum number of vertices to compute and runs RRT-Connect
+        self.tree.reset(pos)
+        self.goal_tree.reset(pac_pos)
+        trees = [(self.tree, pac_pos), (self.goal_tree, pos)]  # every tree with the root of the other one
+        meeting = None
+        counter = max_v
+        while meeting is None and counter and len(self.tree) + len(self.goal_tree) <= max_v + 1:
+            counter -= 1
+            (tree, goal), (other, _) = trees
+            point = self.sample_point(self.layout.width, self.layout.height, goal, self.goal_prob)
+            row = self.extend(tree, point)
+            if row is not None:
+                other_row = self.connect(other, tree.point(row), max_v + 1 - len(tree))
+                if other_row is not None:
+                    meeting = (row, other_row) if tree is self.tree else (other_row, row)
+            trees.reverse()
+        self.meeting = meeting
+        self.reached = meeting is not None
+        path = self.meeting_path(meeting)
+        self.trace_plan(self.tree, pos, path)
+        if len(path) is 0:
+            return None
+
+        return path[-1]
+
+    def extend(self, tree, point):
+        """
+        add the node a step towards point (point itself if it's closer than a step) from the closest node of tree the
+        step is free from, returns its row or None if there is a wall on the way from every node
+        """
+        points = tree.points
+        steps = self.steps(points, point, self.step_size)
+        distances = np.sqrt(((points - point) ** 2).sum(axis=1))
+        steps[distances <= self.step_size] = point
+        row = tree.nearest(point, self.walls.free_segments(points, steps))
+        if row is None or distances[row] == 0:
+            return row
+        return tree.add(steps[row], row)
+
+    def step_towards(self, tree, row, point):
+        """add the node a step from node row towards point, as in extend, returns its row or None"""
+        v = tree.point(row)
+        new = tuple(point) if euclideanDistance(v, point) <= self.step_size else \
+            self.step_vector(v, point, self.step_size)
+        if self.out_of_bounds(new) or self.collision(v, new):
+            return None
+        return tree.add(new, row)
+
+    def connect(self, tree, point, max_v):
+        """
+        extend tree towards point, then keep stepping from the new node until it reaches point (returns its row) or
+        hits a wall or the tree has max_v nodes (returns None)
+        """
+        row = self.extend(tree, point)
+        while row is not None and tree.point(row) != point:
+            if len(tree) >= max_v:
+                return None
+            row = self.step_towards(tree, row, point)
+        return row
+
+    def meeting_path(self, meeting):
+        """
+        the path from the ghost (without it) as RRT returns it, from the last node back: through both trees to pacman
+        if they met, or else to the node of the ghost's tree closest to pacman
+        """
+        if meeting is None:
+            return self.tree.path(self.tree.nearest(self.goal_tree.point(0)))
+        row, goal_row = meeting
+        to_pacman = self.goal_tree.path(goal_row) + [self.goal_tree.point(0)]  # from the node where the trees met
+        return (self.tree.path(row)[::-1] + to_pacman[1:])[::-1]
+
+    def trace_plan(self, tree, pos, path):
+        """trace both trees as one (pacman's tree after the ghost's) and the path through them, from pos"""
+        if not self.trace.enabled():
+            return
+        n = len(tree)
+        self.trace.tree(np.concatenate([tree.points, self.goal_tree.points]),
+                        np.concatenate([tree.parents[:n], self.goal_tree.parents[:len(self.goal_tree)] + n]))
+        self.trace.path([pos] + path[::-1])
+
+class RRTStarGhost(RRTGhost):
+    """
+    A ghost that only know the world via RRT*: a new node takes the parent that gives it the shortest path from the
+    ghost among the nodes within a radius that shrinks as the tree grows, and the nodes within the radius switch to
+    the new node when it shortens their path (rewiring). the tree keeps growing after it reaches pacman, until
+    max_v_in_tree iterations or the time budget are spent, and the plan follows the shortest path found to pacman.
+    the tree is grown from scratch for every plan (reuse_tree and nearest_first aren't used)
+    """
+
+    def __init__(self, index, layout=None, radius=5.0, time_budget=0.02, **kwargs):
+        """
+        :param radius: the largest radius of the choose parent and rewire steps
+        :param time_budget: the seconds a plan may take, the tree stops growing when they are spent (0 for no limit)
+        """
+        RRTGhost.__init__(self, index, layout, **kwargs)
+        self.radius = float(radius)
+        self.time_budget = float(time_budget)
+        # the radius shrinks as gamma * sqrt(log(n) / n), gamma above 2 * sqrt(1.5 * free area / pi) keeps the paths
+        # converging to the shortest one (Karaman and Frazzoli)
+        self.gamma = 2 * math.sqrt(1.5 * layout.walls.count(False) / math.pi)
+        cell_size = SpatialIndex.cell_size_for(layout.width, layout.height, self.max_v_in_tree + 1)
+        self.tree = RRTTree(self.max_v_in_tree + 1, cell_size, euclideanDistance)
+        self.goal = None  # the row of the node the last plan goes to
+
+    def RRT(self, pos, pac_pos, max_v=300): # gets a two points and the maximum number of vertices to compute and runs RRT*
+        tree = self.tree
+        tree.reset(pos)
+        goals = []  # the rows of the nodes close to pacman
+        deadline = time.time() + self.time_budget if self.time_budget else None
+        counter = max_v
+        while counter and len(tree) <= max_v and (deadline is None or time.time() < deadline):
+            counter -= 1
+            point = self.sample_point(self.layout.width, self.layout.height, pac_pos, self.goal_prob)
+            free = self.walls.free(point, tree.points)
+            father = tree.nearest(point, free)
+            if father is None or tree.point(father) == tuple(point):
+                continue
+            row = self.choose_parent_and_rewire(point, father, free)
+            if manhattanDistance(point, pac_pos) < 2:
+                goals.append(row)
+        self.goal = min(goals, key=lambda row: self.path_cost(row, pac_pos)) if goals else len(tree) - 1
+        self.reached = len(goals) > 0
+        path = tree.path(self.goal)
+        self.trace_plan(tree, pos, path)
         if len(path) is 0:
             return None
 
-        return path[-1]
\ No newline at end of file
+        return path[-1]
+
+    def choose_parent_and_rewire(self, point, father, free):
+        """
+        add point to the tree under the node within the radius that gives it the shortest path (father, its closest
+        free node, if none is), then rewire the nodes within the radius through it. returns the row of point
+        :param free: a boolean array, True for the nodes with no wall on the line to point
+        """
+        tree = self.tree
+        n = len(tree)
+        radius = min(self.gamma * math.sqrt(math.log(n + 1) / (n + 1)), self.radius)
+        near = [row for _, _, row in tree.index.within(point, radius) if free[row]]
+        if father not in near:
+            near.append(father)
+        near = np.array(near)
+        distances = np.sqrt(((tree.coords[near] - point) ** 2).sum(axis=1))
+        row = tree.add(point, int(near[np.argmin(tree.costs[near] + distances)]))
+        for other, distance in izip(near, distances):
+            if tree.costs[row] + distance < tree.costs[other]:
+                tree.rewire(int(other), row)
+        return row
+
+    def path_cost(self, row, pac_pos):
+        """the length of the path to pacman through node row"""
+        return self.tree.costs[row] + euclideanDistance(self.tree.point(row), pac_pos)
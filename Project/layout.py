@@ -14,10 +14,13 @@
 
 from util import manhattanDistance
 from game import Grid
+import hashlib
 import os
 import random
+import tempfile
 
 VISIBILITY_MATRIX_CACHE = {}
+LINE_OF_SIGHT_CACHE = {}
 
 class Layout:
     """
@@ -36,6 +39,7 @@ class Layout:
         self.numGhosts = 0
         self.processLayoutText(layoutText)
         self.layoutText = layoutText
+        self.path = None  # the file the layout was loaded from
         self.totalFood = len(self.food.asList())
         # self.initializeVisibilityMatrix()
 
@@ -63,6 +67,53 @@ class Layout:
         else:
             self.visibility = VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)]
 
+    def contentHash(self):
+        return hashlib.sha1('\n'.join(self.layoutText)).hexdigest()[:16]
+
+    def lineOfSightPath(self):
+        """the file of the line of sight bitset of the layout, next to the layout file (None if it wasn't loaded from one)"""
+        if self.path is None:
+            return None
+        return '%s.%s.los' % (self.path, self.contentHash())
+
+    def getLineOfSight(self):
+        """
+        the collision.LineOfSight of the layout, the line of sight between every two cells. it's computed once and
+        saved next to the layout file, keyed by the content of the layout so an edited layout computes it again
+        """
+        import collision
+        import numpy as np
+        key = self.contentHash()
+        if key not in LINE_OF_SIGHT_CACHE:
+            path = self.lineOfSightPath()
+            cells = self.width * self.height
+            bits = None
+            if path is not None and os.path.exists(path):
+                try:
+                    bits = np.load(path)
+                except (IOError, ValueError):  # corrupt, compute it again
+                    pass
+            if bits is None or bits.shape != (cells, (cells + 7) // 8) or bits.dtype != np.uint8:
+                bits = collision.LineOfSight.compute(collision.WallRaster(self.walls))
+                if path is not None:
+                    self.saveLineOfSight(bits, path)
+            LINE_OF_SIGHT_CACHE[key] = collision.LineOfSight(bits, self.height)
+        return LINE_OF_SIGHT_CACHE[key]
+
+    def saveLineOfSight(self, bits, path):
+        """write to a temporary file and rename it, so a concurrent reader never sees half of it"""
+        import numpy as np
+        try:
+            fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+        except OSError:  # a read only layouts directory, the bitset is only kept in memory
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, bits)
+            os.rename(tmp, path)
+        except (IOError, OSError):
+            os.remove(tmp)
+
     def isWall(self, pos):
         x, col = pos
         return self.walls[x][col]
@@ -92,7 +143,9 @@ class Layout:
         return "\n".join(self.layoutText)
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        layout = Layout(self.layoutText[:])
+        layout.path = self.path
+        return layout
 
     def processLayoutText(self, layoutText):
         """
@@ -151,5 +204,8 @@ def getLayout(name, back = 2):
 def tryToLoad(fullname):
     if(not os.path.exists(fullname)): return None
     f = open(fullname)
-    try: return Layout([line.strip() for line in f])
+    try:
+        layout = Layout([line.strip() for line in f])
+        layout.path = os.path.abspath(fullname)
+        return layout
     finally: f.close()
@@ -0,0 +1,152 @@
+# liveView.py
+# -----------
+# a live view of the planning ghosts: listens on a unix socket for the trace records the ghosts publish while they
+# play (pacman.py --live, see plannerTrace.Publisher) and draws the roadmap, RRT tree, grid and path of every ghost as
+# the game goes. the records are applied to the state of their ghost as they arrive and the figure is redrawn at most
+# every --interval seconds, nothing is read from the trace files.
+#
+# usage: python liveView.py [options], then run a game with --live (e.g. python pacman.py -g PRMGhost -k 2 --live)
+
+import os
+import select
+import socket
+import time
+from optparse import OptionParser
+
+import plannerTrace
+
+RECEIVE = 2 ** 16  # bytes read from a game at once
+
+
+class LiveView(object):
+    """the states of the ghosts, updated from the records the games send"""
+
+    def __init__(self, address=plannerTrace.LIVE_SOCKET):
+        """
+        :param address: the path of the unix socket to listen on
+        """
+        if os.path.exists(address):  # left by a viewer that didn't exit cleanly
+            os.remove(address)
+        self.address = address
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(address)
+        self.server.listen(4)
+        self.games = {}  # the connection of a game -> the bytes received from it that aren't a whole frame yet
+        self.states = {}  # ghost index -> its plannerTrace.TraceState
+        self.changed = set()  # the ghosts whose state changed since the last draw
+        self.records = 0
+
+    def receive(self, timeout):
+        """apply the records received within timeout seconds"""
+        readable, _, _ = select.select([self.server] + list(self.games), [], [], timeout)
+        for connection in readable:
+            if connection is self.server:
+                game, _ = self.server.accept()
+                self.games[game] = bytearray()
+                continue
+            data = connection.recv(RECEIVE)
+            if not data:  # the game is over
+                connection.close()
+                del self.games[connection]
+                continue
+            self.games[connection] += data
+            self.apply(self.games[connection])
+
+    def apply(self, data):
+        """apply the whole frames at the beginning of data and remove them from it"""
+        offset = 0
+        while offset + plannerTrace.FRAME.size <= len(data):
+            index, length = plannerTrace.FRAME.unpack_from(data, offset)
+            start = offset + plannerTrace.FRAME.size
+            if start + length > len(data):
+                break
+            records, _ = plannerTrace.decode(bytes(data[start:start + length]))
+            state = self.states.setdefault(index, plannerTrace.TraceState())
+            for kind, tick, rows in records:
+                state.apply(kind, tick, rows)
+            self.records += len(records)
+            self.changed.add(index)
+            offset = start + length
+        del data[:offset]
+
+    def close(self):
+        for game in self.games:
+            game.close()
+        self.server.close()
+        os.remove(self.address)
+
+
+class Plot(object):
+    """the matplotlib figure of a LiveView, a panel per ghost"""
+
+    def __init__(self):
+        import matplotlib.pyplot as plt
+        self.plt = plt
+        plt.ion()
+        self.figure = plt.figure('planning ghosts')
+        self.panels = {}  # ghost index -> its artists
+
+    def draw(self, view):
+        """redraw the ghosts that changed since the last draw"""
+        from matplotlib.collections import LineCollection
+        if set(view.states) != set(self.panels):  # a new ghost, every panel is laid out again
+            self.figure.clf()
+            self.panels = {}
+            for i, index in enumerate(sorted(view.states)):
+                axes = self.figure.add_subplot(1, len(view.states), i + 1)
+                axes.set_aspect('equal')
+                roadmap = axes.add_collection(LineCollection([], colors='b', linewidths=0.5, alpha=0.3))
+                tree = axes.add_collection(LineCollection([], colors='r', linewidths=0.5, alpha=0.5))
+                path, = axes.plot([], [], 'g-', linewidth=1.5)
+                self.panels[index] = (axes, roadmap, tree, path, [None])
+            view.changed = set(view.states)
+        for index in view.changed:
+            state = view.states[index]
+            axes, roadmap, tree, path, grid = self.panels[index]
+            roadmap.set_segments(state.edges)
+            points = [point for point, _ in state.tree]
+            tree.set_segments([(point, points[parent]) for point, parent in state.tree])
+            path.set_data([q[0] for q in state.path], [q[1] for q in state.path])
+            if state.grid is not None:
+                if grid[0] is None:
+                    grid[0] = axes.imshow(state.grid.T, origin='lower', cmap='RdYlGn', vmin=0, vmax=1)
+                grid[0].set_data(state.grid.T)
+            axes.set_title('ghost %d, tick %s' % (index, state.tick))
+            axes.autoscale_view()
+        view.changed = set()
+        self.figure.canvas.draw_idle()
+        self.plt.pause(0.001)
+
+
+def report(view):
+    """a line per ghost that changed since the last report, for --print"""
+    for index in sorted(view.changed):
+        state = view.states[index]
+        print('ghost %d tick %s: %d vertices, %d edges, %d tree nodes, %d path nodes%s'
+              % (index, state.tick, len(state.adjacency), len(state.edges), len(state.tree), len(state.path),
+                 '' if state.grid is None else ', grid %dx%d' % state.grid.shape))
+    view.changed = set()
+
+
+if __name__ == '__main__':
+    parser = OptionParser('python liveView.py [options]\n'
+                          'shows the planning of the ghosts of the games run with pacman.py --live')
+    parser.add_option('--socket', default=plannerTrace.LIVE_SOCKET, help='the socket to listen on [Default: %default]')
+    parser.add_option('--interval', type='float', default=0.2, help='seconds between redraws [Default: %default]')
+    parser.add_option('--print', dest='text', action='store_true', default=False,
+                      help='print the size of every ghost\'s state instead of drawing it')
+    options, _ = parser.parse_args()
+    view = LiveView(options.socket)
+    draw = report if options.text else Plot().draw
+    print('listening on %s' % options.socket)
+    try:
+        next_draw = 0
+        while True:
+            view.receive(options.interval)
+            if view.changed and time.time() >= next_draw:
+                draw(view)
+                next_draw = time.time() + options.interval
+    except KeyboardInterrupt:
+        pass
+    finally:
+        view.close()
@@ -45,7 +45,7 @@ from game import Directions
 from game import Actions
 from util import nearestPoint
 from util import manhattanDistance
-import util, layout
+import util, layout, plannerTrace
 import sys, types, time, random, os
 
 ###################################################
@@ -517,6 +517,8 @@ def readCommand( argv ):
                       help='A recorded game file (pickle) to replay', default=None)
     parser.add_option('-a','--agentArgs',dest='agentArgs',
                       help='Comma separated values sent to agent. e.g. "opt1=val1,opt2,opt3=val3"')
+    parser.add_option('-A','--ghostArgs',dest='ghostArgs',
+                      help='Comma separated values sent to the ghosts. e.g. "samples=1000,planner=tree"')
     parser.add_option('-x', '--numTraining', dest='numTraining', type='int',
                       help=default('How many episodes are training (suppresses output)'), default=0)
     parser.add_option('--frameTime', dest='frameTime', type='float',
@@ -525,6 +527,14 @@ def readCommand( argv ):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--trace', dest='trace', type='choice', choices=['off', 'sampled', 'full'],
+                      help='Trace files of the planning ghosts for the show_* scripts: off, sampled or full '
+                           '[Default: off with -q, full otherwise]', default=None)
+    parser.add_option('--traceEvery', dest='traceEvery', type='int',
+                      help=default('Ticks of a ghost between its traced ones with --trace sampled'), default=10)
+    parser.add_option('--live', action='store_true', dest='live',
+                      help='Publish the planning of the ghosts to a running liveView.py (traces every tick unless '
+                           '--trace is given)', default=False)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -556,8 +566,11 @@ def readCommand( argv ):
 
     # Choose a ghost agent
     # to run more then one ghost, comment out the lines 559 and 560 and uncomment the line 561 and 562-565 (depending on the number of ghosts you want) change the ghosts type as you like, then run pacman.py normally
+    trace = options.trace or ('off' if options.quietGraphics and not options.live else 'full')
+    plannerTrace.configure(trace, options.traceEvery, plannerTrace.LIVE_SOCKET if options.live else None)
     ghostType = loadAgent(options.ghost, noKeyboard)
-    args['ghosts'] = [ghostType(i+1, args['layout']) for i in range( options.numGhosts )]
+    ghostOpts = parseAgentArgs(options.ghostArgs)
+    args['ghosts'] = [ghostType(i+1, args['layout'], **ghostOpts) for i in range( options.numGhosts )]
     # args['ghosts'] = []
     # args['ghosts'].append(loadAgent('PRMGhost', noKeyboard)(1, args['layout']))
     # args['ghosts'].append(loadAgent('RRTGhost', noKeyboard)(2, args['layout']))
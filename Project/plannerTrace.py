@@ -0,0 +1,432 @@
+# plannerTrace.py
+# ---------------
+# the traces of the planning ghosts, that show_PRM.py, show_RRT.py and show_Grid.py replay. every ghost has a Trace
+# that counts its ticks (getDistribution calls) and records the traced ticks, the level sets which ticks are traced:
+#   off     - none, no file is touched (the default, and pacman.py's default with -q)
+#   sampled - every EVERY-th tick of each ghost (and its construction), the roadmap changes of the ticks in between
+#             are recorded with the next traced tick
+#   full    - every tick (pacman.py's default with graphics)
+# the records are queued to a single writer thread, so the game thread never waits for the disk. they can also be
+# published to a live viewer (liveView.py) over a unix socket, see Publisher.
+#
+# a ghost's trace is an append only binary file, trace_ghost_<index>.ptr:
+#   MAGIC, then records - a RECORD header (kind, tick, rows, columns) and a little endian array of rows x columns
+#   (float64, uint8 for the grids). the roadmap is recorded as the changes of every tick (the roadmap listener
+#   interface), a KEYFRAME record followed by the whole roadmap and the last path, tree and grid is written instead
+#   whenever the changes since the last one add up to more than the roadmap itself, so a trace takes at most about
+#   twice the changes and replaying any tick reads at most about twice the roadmap.
+# and an index of its ticks, trace_ghost_<index>.pti:
+#   INDEX entries - a traced tick, the offset of its first record and the offset of the keyframe to replay it from.
+
+import atexit
+import bisect
+import os
+import Queue
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+LEVELS = ('off', 'sampled', 'full')
+LEVEL = 'off'
+EVERY = 10
+QUEUE = Queue.Queue()
+WRITER = None
+TRACES = []  # the traces that recorded something, their pending changes are written by flush
+LIVE = None  # the Publisher of the live view
+LIVE_SOCKET = os.path.join(tempfile.gettempdir(), 'pacman_planner.sock')
+LIVE_QUEUE = 1000  # frames waiting for the viewer, more are dropped
+RECONNECT = 1.0  # seconds between the attempts to connect to the viewer
+
+MAGIC = 'PACTRC01'
+RECORD = struct.Struct('<BIII')  # kind, tick, rows, columns
+INDEX = struct.Struct('<qqq')  # tick, offset of its first record, offset of its keyframe
+FRAME = struct.Struct('<II')  # ghost index, length of the records that follow, a message to the live viewer
+
+# the record kinds
+KEYFRAME = 0  # no rows, the state is cleared, the records after it in its tick restore it
+VERTICES = 1  # [n, 2] vertices added to the roadmap
+REMOVED_VERTICES = 2  # [n, 2] vertices removed from the roadmap, with their edges
+EDGES = 3  # [n, 4] (x1, y1, x2, y2) edges added to the roadmap
+REMOVED_EDGES = 4  # [n, 4] edges removed from the roadmap
+PATH = 5  # [n, 2] the path the ghost follows
+TREE = 6  # [n, 3] (x, y, parent row) an RRT tree in the order it was grown, the root is its own parent
+GRID = 7  # [width, height] the grid of the grid ghost, 1 for a free tile
+DTYPES = dict((kind, np.dtype('<f8')) for kind in (KEYFRAME, VERTICES, REMOVED_VERTICES, EDGES, REMOVED_EDGES, PATH,
+                                                    TREE))
+DTYPES[GRID] = np.dtype('u1')
+
+
+def configure(level='off', every=EVERY, live=None):
+    """
+    set the trace level of every ghost, every is the ticks between the traced ones at the sampled level.
+    live is the address of the socket of a live viewer to publish the records to as well (LIVE_SOCKET by default)
+    """
+    global LEVEL, EVERY, LIVE
+    if level not in LEVELS:
+        raise ValueError('unknown trace level %r, use one of %s' % (level, ', '.join(LEVELS)))
+    LEVEL, EVERY = level, max(int(every), 1)
+    LIVE = Publisher(live) if live else None
+
+
+def trace_path(index):
+    return 'trace_ghost_%s.ptr' % index
+
+
+def index_path(index):
+    return 'trace_ghost_%s.pti' % index
+
+
+def encode(kind, tick, rows):
+    """a record as bytes"""
+    rows = np.ascontiguousarray(rows, dtype=DTYPES[kind])
+    if rows.ndim == 1:
+        rows = rows.reshape(-1, 2) if kind != KEYFRAME else rows.reshape(0, 0)
+    return RECORD.pack(kind, tick, rows.shape[0], rows.shape[1]) + rows.tobytes()
+
+
+class Trace(object):
+    """the trace of a single ghost"""
+
+    def __init__(self, index):
+        """
+        :param index: the index of the ghost, the trace is written to trace_path(index) and index_path(index)
+        """
+        self.index = index
+        self.ticks = 0
+        self.lock = threading.Lock()  # a roadmap built in the background is attached from the build thread
+        self.offset = None  # the bytes written to the trace file, None until it's created
+        self.keyframe = 0  # the offset of the last keyframe
+        self.indexed = None  # the last tick in the index
+        self.roadmap = None
+        self.changes = []  # (kind, rows) changes of the roadmap that weren't written yet
+        self.changed = 0  # rows of the changes since the last keyframe
+        self.last = {}  # kind -> the last PATH / TREE / GRID record, rewritten after a keyframe
+        self.resync = False  # write a keyframe next, for a live viewer that missed records
+
+    def tick(self):
+        """start the trace of the next tick, called at the beginning of getDistribution"""
+        with self.lock:
+            if self.enabled():
+                self.emit([])
+            self.ticks += 1
+
+    def enabled(self):
+        """whether the current tick is traced, the construction of the ghost is tick 0"""
+        return LEVEL == 'full' or (LEVEL == 'sampled' and self.ticks % EVERY == 0)
+
+    def attach(self, roadmap):
+        """record roadmap and its changes from now on"""
+        if LEVEL == 'off':
+            return
+        with self.lock:
+            if self.roadmap is not None:
+                self.roadmap.listeners.remove(self)
+            self.roadmap = roadmap
+            roadmap.listeners.append(self)
+            self.emit([], keyframe=True)
+
+    def path(self, points):
+        self.record(PATH, points)
+
+    def tree(self, points, parents):
+        """an RRT tree as its points and the row of the parent of every point"""
+        if self.enabled():
+            self.record(TREE, np.column_stack([np.asarray(points, dtype=float).reshape(-1, 2), parents]))
+
+    def grid(self, grid):
+        self.record(GRID, np.asarray(grid, dtype=np.uint8))
+
+    def record(self, kind, rows):
+        """write a record if the current tick is traced"""
+        if self.enabled():
+            with self.lock:
+                self.emit([(kind, rows)])
+
+    def emit(self, records, keyframe=False):
+        """
+        write the pending changes of the roadmap and records, or a keyframe and records if the changes since the last
+        keyframe add up to more than the roadmap
+        """
+        if not records and not self.changes and not keyframe and not self.resync:
+            return
+        changes = sum(len(rows) for _, rows in self.changes)
+        # a trace starts with a keyframe so a live viewer drops what it showed for an earlier ghost with this index
+        keyframe = (keyframe or self.resync or self.offset is None or
+                    (self.roadmap is not None and self.changed + changes > len(self.roadmap) + self.roadmap_edges()))
+        self.resync = False
+        start_writer()
+        if self.offset is None:  # the first record of this run, the trace of an earlier run is replaced
+            QUEUE.put((trace_path(self.index), MAGIC, False))
+            QUEUE.put((index_path(self.index), '', False))
+            self.offset = self.keyframe = len(MAGIC)
+            TRACES.append(self)
+        offset = self.offset
+        data = []
+        if keyframe:
+            self.keyframe = offset
+            data.append(encode(KEYFRAME, self.ticks, np.zeros(0)))
+            if self.roadmap is not None:
+                coords, indptr, indices, _ = self.roadmap.to_arrays()
+                rows = np.repeat(np.arange(len(coords)), np.diff(indptr))
+                edges = np.column_stack([coords[rows], coords[indices]])[rows < indices]
+                data.append(encode(VERTICES, self.ticks, coords))
+                data.append(encode(EDGES, self.ticks, edges))
+            data.extend(self.last[kind] for kind in (PATH, TREE, GRID) if kind in self.last)
+            self.changed = 0
+        else:
+            data.extend(encode(kind, self.ticks, rows) for kind, rows in self.changes)
+            self.changed += changes
+        self.changes = []
+        for kind, rows in records:
+            record = encode(kind, self.ticks, rows)
+            if kind in (PATH, TREE, GRID):
+                self.last[kind] = record
+            data.append(record)
+        data = ''.join(data)
+        self.offset += len(data)
+        QUEUE.put((trace_path(self.index), data, True))
+        if LIVE is not None:
+            LIVE.publish(self.index, data)
+        if self.indexed != self.ticks:
+            self.indexed = self.ticks
+            QUEUE.put((index_path(self.index), INDEX.pack(self.ticks, offset, self.keyframe), True))
+
+    def roadmap_edges(self):
+        return self.roadmap.num_edges if hasattr(self.roadmap, 'num_edges') else len(self.roadmap.edges)
+
+    # roadmap listener
+    def vertex_added(self, q):
+        self.changes.append((VERTICES, [q]))
+
+    def edge_added(self, q1, q2):
+        self.changes.append((EDGES, [q1 + q2]))
+
+    def edge_removed(self, q1, q2):
+        self.changes.append((REMOVED_EDGES, [q1 + q2]))
+
+    def vertex_removed(self, q, neighbors):
+        self.changes.append((REMOVED_VERTICES, [q]))
+
+    def flush(self):
+        """write the changes of the roadmap since the last traced tick"""
+        with self.lock:
+            self.emit([])
+
+
+def start_writer():
+    global WRITER
+    if WRITER is None:
+        WRITER = threading.Thread(target=writer)
+        WRITER.daemon = True
+        WRITER.start()
+        atexit.register(flush)
+
+
+def writer():
+    while True:
+        batch = [QUEUE.get()]
+        while not QUEUE.empty():
+            batch.append(QUEUE.get())
+        try:
+            write_batch(batch)
+        except (IOError, OSError) as e:  # the game goes on without its trace
+            sys.stderr.write('planner trace: %s\n' % e)
+        finally:
+            for _ in batch:
+                QUEUE.task_done()
+
+
+def write_batch(batch):
+    """write the (name, data, append) of batch in order, dropping the writes an overwrite of their file replaces"""
+    files = {}
+    for name, data, append in batch:
+        if not append:
+            files[name] = [False]
+        files.setdefault(name, [True]).append(data)
+    for name, data in files.items():
+        with open(name, 'ab' if data[0] else 'wb') as f:
+            f.write(''.join(data[1:]))
+
+
+def flush():
+    """write the pending changes of every trace and wait until everything queued is written"""
+    for trace in TRACES:
+        trace.flush()
+    if WRITER is not None:
+        QUEUE.join()
+
+
+class Publisher(object):
+    """
+    sends the records of every trace to a live viewer listening on a unix socket (liveView.py), from its own thread.
+    the ghosts never wait for it: the records are dropped while no viewer is listening or when too many are waiting,
+    and every trace writes a keyframe next when a viewer connects or records are dropped
+    """
+
+    def __init__(self, address=LIVE_SOCKET):
+        self.address = address
+        self.frames = Queue.Queue(maxsize=LIVE_QUEUE)
+        self.socket = None
+        self.next_attempt = 0  # time of the next connection attempt
+        self.sent = 0
+        self.dropped = 0
+        thread = threading.Thread(target=self.run)
+        thread.daemon = True
+        thread.start()
+
+    def publish(self, index, data):
+        try:
+            self.frames.put_nowait(FRAME.pack(index, len(data)) + data)
+        except Queue.Full:
+            self.drop()
+
+    def drop(self):
+        self.dropped += 1
+        for trace in TRACES:
+            trace.resync = True
+
+    def connect(self):
+        """connect to the viewer if it's time for another attempt, returns whether connected"""
+        if self.socket is None and time.time() >= self.next_attempt:
+            self.next_attempt = time.time() + RECONNECT
+            viewer = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                viewer.connect(self.address)
+            except socket.error:
+                viewer.close()
+                return False
+            self.socket = viewer
+            self.drop()  # the viewer needs the whole state
+        return self.socket is not None
+
+    def run(self):
+        while True:
+            frame = self.frames.get()
+            if not self.connect():
+                self.dropped += 1
+                continue
+            try:
+                self.socket.sendall(frame)
+                self.sent += 1
+            except socket.error:  # the viewer was closed
+                self.socket.close()
+                self.socket = None
+                self.drop()
+
+
+##### reading #####
+def decode(data, offset=0):
+    """the (kind, tick, rows) records in data from offset, and the offset after the last whole record"""
+    found = []
+    while offset + RECORD.size <= len(data):
+        kind, tick, rows, columns = RECORD.unpack_from(data, offset)
+        dtype = DTYPES[kind]
+        end = offset + RECORD.size + rows * columns * dtype.itemsize
+        if end > len(data):
+            break
+        rows = np.frombuffer(data, dtype, rows * columns, offset + RECORD.size).reshape(rows, columns)
+        found.append((kind, tick, rows))
+        offset = end
+    return found, offset
+
+
+def records(index, offset=None):
+    """
+    the (kind, tick, rows) records of the trace of ghost index from offset (the first one by default). the file is
+    read as the records are used, so a trace that is still being written can be followed
+    """
+    with open(trace_path(index), 'rb') as f:
+        magic = f.read(len(MAGIC))
+        if not magic:  # created but not written yet
+            return
+        if magic != MAGIC:
+            raise ValueError('%s is not a planner trace' % trace_path(index))
+        if offset:
+            f.seek(offset)
+        while True:
+            header = f.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            kind, tick, rows, columns = RECORD.unpack(header)
+            dtype = DTYPES[kind]
+            size = rows * columns * dtype.itemsize
+            data = f.read(size)
+            if len(data) < size:  # the writer is in the middle of this record
+                return
+            yield kind, tick, np.frombuffer(data, dtype).reshape(rows, columns)
+
+
+def keyframe_offset(index, tick):
+    """the offset of the keyframe to replay tick from, None if the trace has no index"""
+    try:
+        with open(index_path(index), 'rb') as f:
+            data = f.read()
+    except IOError:
+        return None
+    entries = [INDEX.unpack_from(data, i) for i in range(0, len(data) - len(data) % INDEX.size, INDEX.size)]
+    i = bisect.bisect_right([entry[0] for entry in entries], tick)
+    return entries[i - 1][2] if i else None
+
+
+class TraceState(object):
+    """the state of a ghost's planning replayed from its trace"""
+
+    def __init__(self):
+        self.tick = None
+        self.adjacency = defaultdict(set)  # the roadmap, vertex -> its neighbors
+        self.path = []
+        self.tree = []  # (point, parent row) in the order the tree was grown
+        self.grid = None
+
+    @property
+    def vertices(self):
+        return list(self.adjacency)
+
+    @property
+    def edges(self):
+        return [(q1, q2) for q1, neighbors in self.adjacency.items() for q2 in neighbors if q1 < q2]
+
+    def apply(self, kind, tick, rows):
+        self.tick = tick
+        points = [tuple(row) for row in rows.tolist()]
+        if kind == KEYFRAME:
+            self.adjacency.clear()
+            self.path, self.tree, self.grid = [], [], None
+        elif kind == VERTICES:
+            for q in points:
+                self.adjacency[q]
+        elif kind == REMOVED_VERTICES:
+            for q in points:
+                for u in self.adjacency.pop(q, ()):
+                    self.adjacency[u].discard(q)
+        elif kind == EDGES:
+            for row in points:
+                self.adjacency[row[:2]].add(row[2:])
+                self.adjacency[row[2:]].add(row[:2])
+        elif kind == REMOVED_EDGES:
+            for row in points:
+                self.adjacency[row[:2]].discard(row[2:])
+                self.adjacency[row[2:]].discard(row[:2])
+        elif kind == PATH:
+            self.path = points
+        elif kind == TREE:
+            self.tree = [(row[:2], int(row[2])) for row in points]
+        elif kind == GRID:
+            self.grid = rows
+
+
+def replay(index, tick=None):
+    """the TraceState of ghost index at the end of tick (the last traced tick by default)"""
+    state = TraceState()
+    offset = keyframe_offset(index, tick if tick is not None else sys.maxint)
+    for kind, record_tick, rows in records(index, offset):
+        if tick is not None and record_tick > tick:
+            break
+        state.apply(kind, record_tick, rows)
+    return state
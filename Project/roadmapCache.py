@@ -0,0 +1,186 @@
+# roadmapCache.py
+# ---------------
+# an on disk cache of built PRM roadmaps, so a ghost only samples and connects a roadmap the first time it's used.
+#
+# every entry is a single binary file that is memory mapped when loaded:
+#   header   - MAGIC, number of vertices, number of adjacency entries (int64 little endian)
+#   coords   - float64 [n, 2], the vertices
+#   indptr   - int64 [n + 1]   \
+#   weights  - float64 [nnz]    > the CSR adjacency of the vertices (every edge appears in both rows)
+#   indices  - int32 [nnz]     /
+# the file name is <layout hash>_<parameters hash>.prm, the layout part lets us invalidate a layout's entries.
+#
+# usage: python roadmapCache.py [options] - prebuilds the roadmaps of every layout in layouts/
+#        python roadmapCache.py --clear  - empties the cache
+
+import hashlib
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+MAGIC = 'PACPRM01'  # bump it when the format or the way roadmaps are built changes, old entries are then ignored
+HEADER = struct.Struct('<8sqq')
+CACHE_DIR = os.environ.get('PACMAN_ROADMAP_CACHE', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                 'roadmap_cache'))
+MAX_BYTES = 256 * 2 ** 20
+
+
+def layout_hash(layout):
+    return layout.contentHash()
+
+
+def cache_key(layout, samples, degree, sampler='uniform', seed=None):
+    """the name of the cache entry of a roadmap built on layout with the given parameters"""
+    params = '%s|%d|%d|%s|%r' % (MAGIC, samples, degree, sampler, seed)
+    return '%s_%s' % (layout_hash(layout), hashlib.sha1(params).hexdigest()[:16])
+
+
+def entry_path(key, cache_dir=None):
+    return os.path.join(cache_dir or CACHE_DIR, key + '.prm')
+
+
+def store(key, roadmap, cache_dir=None, max_bytes=MAX_BYTES):
+    """write roadmap to the cache under key, then evict the least recently used entries above max_bytes"""
+    cache_dir = cache_dir or CACHE_DIR
+    if not os.path.isdir(cache_dir):
+        try:
+            os.makedirs(cache_dir)
+        except OSError:  # created meanwhile by another process
+            pass
+    coords, indptr, indices, weights = roadmap.to_arrays()
+    # write to a temporary file and rename it, so a concurrent reader never sees half an entry
+    fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=cache_dir)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(coords), len(indices)))
+        f.write(np.ascontiguousarray(coords, dtype='<f8').tobytes())
+        f.write(np.ascontiguousarray(indptr, dtype='<i8').tobytes())
+        f.write(np.ascontiguousarray(weights, dtype='<f8').tobytes())
+        f.write(np.ascontiguousarray(indices, dtype='<i4').tobytes())
+    os.rename(tmp, entry_path(key, cache_dir))
+    evict(max_bytes, cache_dir)
+
+
+def load_arrays(key, cache_dir=None):
+    """the memory mapped (coords, indptr, indices, weights) of an entry, or None if it's missing or corrupt"""
+    path = entry_path(key, cache_dir)
+    try:
+        with open(path, 'rb') as f:
+            magic, n, nnz = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or os.path.getsize(path) != HEADER.size + 16 * n + 8 * (n + 1) + 12 * nnz:
+            raise ValueError('corrupt roadmap cache entry')
+    except (IOError, OSError, struct.error, ValueError):
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+    os.utime(path, None)  # the mtime is the last use of the entry, for the LRU eviction
+    offset = HEADER.size
+    arrays = []
+    for dtype, shape in (('<f8', (n, 2)), ('<i8', (n + 1,)), ('<f8', (nnz,)), ('<i4', (nnz,))):
+        if np.prod(shape) == 0:  # mmap can't map an empty region
+            arrays.append(np.zeros(shape, dtype=dtype))
+        else:
+            arrays.append(np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape))
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    coords, indptr, weights, indices = arrays
+    return coords, indptr, indices, weights
+
+
+def load(key, roadmap_type, cell_size=1.0, cache_dir=None):
+    """the cached roadmap of key as a roadmap_type (Roadmap or CompactRoadmap), or None if it isn't cached"""
+    arrays = load_arrays(key, cache_dir)
+    if arrays is None:
+        return None
+    return roadmap_type.from_arrays(*arrays, cell_size=cell_size)
+
+
+def entries(cache_dir=None):
+    """(path, size, mtime) of the cache entries from the least recently used"""
+    cache_dir = cache_dir or CACHE_DIR
+    if not os.path.isdir(cache_dir):
+        return []
+    result = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.prm'):
+            path = os.path.join(cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:  # evicted by another process
+                continue
+            result.append((path, stat.st_size, stat.st_mtime))
+    return sorted(result, key=lambda entry: entry[2])
+
+
+def evict(max_bytes=MAX_BYTES, cache_dir=None):
+    """remove the least recently used entries until the cache takes at most max_bytes"""
+    cached = entries(cache_dir)
+    total = sum(size for _, size, _ in cached)
+    for path, size, _ in cached:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+
+def invalidate(layout=None, cache_dir=None):
+    """remove the entries of layout (of every layout if it's None), returns the number of removed entries"""
+    prefix = layout_hash(layout) + '_' if layout is not None else ''
+    removed = 0
+    for path, _, _ in entries(cache_dir):
+        if os.path.basename(path).startswith(prefix):
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def prebuild(args):
+    """builds and caches the roadmap of a single layout, returns a line for the report"""
+    import time
+    import layout
+    import ghostAgents
+    name, samples, degree, sampler, seed, cache_dir = args
+    lay = layout.getLayout(name)
+    if lay is None or lay.getNumGhosts() == 0:
+        return '%-22s skipped (no ghosts)' % name
+    key = cache_key(lay, samples, degree, sampler, seed)
+    if os.path.exists(entry_path(key, cache_dir)):
+        return '%-22s already cached' % name
+    start = time.time()
+    ghostAgents.PRMGhost(1, lay, samples=samples, degree=degree, seed=seed, cache=True, cache_dir=cache_dir,
+                         sampler=sampler)
+    return '%-22s built in %.2fs' % (name, time.time() - start)
+
+
+if __name__ == '__main__':
+    import multiprocessing
+    from optparse import OptionParser
+    parser = OptionParser('python roadmapCache.py [options]\n'
+                          'prebuilds the PRM roadmaps of every layout in layouts/ for the given parameters')
+    parser.add_option('-s', '--samples', type='int', default=300, help='number of samples [Default: %default]')
+    parser.add_option('-d', '--degree', type='int', default=20, help='degree of the vertices [Default: %default]')
+    parser.add_option('--sampler', default='uniform', help='sampler of the roadmap vertices [Default: %default]')
+    parser.add_option('--seed', type='int', default=0, help='sampling seed [Default: %default]')
+    parser.add_option('-j', '--jobs', type='int', default=multiprocessing.cpu_count(),
+                      help='parallel builds [Default: %default]')
+    parser.add_option('--cacheDir', default=None, help='cache directory [Default: ' + CACHE_DIR + ']')
+    parser.add_option('--clear', action='store_true', default=False, help='remove every cached roadmap')
+    options, _ = parser.parse_args()
+    if options.clear:
+        print('removed %d roadmaps' % invalidate(cache_dir=options.cacheDir))
+    else:
+        layouts_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'layouts')
+        os.chdir(os.path.dirname(layouts_dir))
+        names = sorted(name[:-len('.lay')] for name in os.listdir(layouts_dir) if name.endswith('.lay'))
+        pool = multiprocessing.Pool(options.jobs)
+        for line in pool.imap(prebuild, [(name, options.samples, options.degree, options.sampler, options.seed,
+                                          options.cacheDir) for name in names]):
+            print(line)
+        pool.close()
+        pool.join()
@@ -0,0 +1,149 @@
+# samplers.py
+# -----------
+# the samplers of the PRM ghosts: where the roadmap vertices are placed. (PRMGhost.sample_space, -A sampler=<name>)
+# a sampler(walls, n, rng) returns n points in free cells as a float array [n, 2] rounded to 3 decimal places,
+# walls is the boolean wall raster of the layout (walls[x, y]) and rng a numpy RandomState.
+# the points are generated in vectorized batches, a batch is sized by the share of the candidates accepted so far.
+#   free     - uniform over the free cells
+#   halton   - the halton sequence (bases 2 and 3) over the layout, from a random index, the points in walls dropped
+#   sobol    - a randomly shifted 2d sobol sequence over the layout, the points in walls dropped
+#   gaussian - pairs of points at a gaussian distance, the free one of the pairs that have one point in a wall, so the
+#              samples are close to the walls (Boor et al. 1999)
+#   bridge   - pairs of points in walls at a gaussian distance whose midpoint is free, so the samples are in the
+#              narrow corridors (Hsu et al. 2003)
+# (the default sampler, uniform over the whole layout with the samples in walls kept, is PRMGhost.sample_space)
+
+import numpy as np
+
+GAUSSIAN_SIGMA = 1.0  # the standard deviation of the distance of the gaussian sampler pairs, in cells
+BRIDGE_SIGMA = 1.5  # the standard deviation of the length of the bridges, in cells
+MAX_BATCHES = 50  # a sampler that accepts too few candidates (bridges in an open layout) fills up with free samples
+
+
+def in_wall(walls, points):
+    """a boolean array, True for the points in a wall or out of the layout"""
+    cells = np.floor(points).astype(np.int64)
+    inside = (cells[:, 0] >= 0) & (cells[:, 0] < walls.shape[0]) & (cells[:, 1] >= 0) & (cells[:, 1] < walls.shape[1])
+    result = np.ones(len(points), dtype=bool)
+    result[inside] = walls[cells[inside, 0], cells[inside, 1]]
+    return result
+
+
+def box(walls, rng, n):
+    """n uniform points in the layout without its border, like PRMGhost.sample_space"""
+    width, height = walls.shape
+    return rng.uniform((1, 1), (width - 1, height - 1), size=(n, 2))
+
+
+def rejection(walls, n, rng, candidates):
+    """
+    the first n free points of the batches candidates(rng, size, start) returns, start is the number of candidates
+    generated so far (the index of a sequence)
+    """
+    samples, accepted, generated = [], 0, 0
+    for _ in range(MAX_BATCHES):
+        if accepted >= n:
+            break
+        rate = (accepted + 1.0) / (generated + 1.0)
+        size = int(min(max((n - accepted) / rate * 1.2, 64), 1e6))
+        points = np.round(candidates(rng, size, generated), 3)
+        generated += size
+        points = points[~in_wall(walls, points)]
+        samples.append(points)
+        accepted += len(points)
+    samples = np.concatenate(samples)[:n] if samples else np.zeros((0, 2))
+    if len(samples) < n:
+        samples = np.concatenate([samples, free(walls, n - len(samples), rng)])
+    return samples
+
+
+def free(walls, n, rng):
+    cells = np.argwhere(~walls)
+    if len(cells) == 0:
+        raise ValueError('the layout has no free cells')
+    offsets = rng.uniform(0, 0.999, size=(n, 2))  # 0.999 so the rounding never moves a point to the next cell
+    return np.round(cells[rng.randint(len(cells), size=n)] + offsets, 3)
+
+
+def radical_inverse(indices, base):
+    """the van der corput sequence of base at indices (the digits of the index in base mirrored around the point)"""
+    indices = np.array(indices, dtype=np.int64)
+    result = np.zeros(len(indices))
+    scale = 1.0 / base
+    while indices.any():
+        result += scale * (indices % base)
+        indices //= base
+        scale /= base
+    return result
+
+
+def halton(walls, n, rng):
+    width, height = walls.shape
+    first = rng.randint(2 ** 20)
+
+    def candidates(rng, size, start):
+        indices = first + start + np.arange(size)
+        unit = np.column_stack([radical_inverse(indices, 2), radical_inverse(indices, 3)])
+        return 1 + unit * (width - 2, height - 2)
+
+    return rejection(walls, n, rng, candidates)
+
+
+SOBOL_BITS = 30
+
+
+def sobol_directions():
+    """the direction numbers of the first two sobol dimensions (x and the primitive polynomial x + 1)"""
+    first = [1 << (SOBOL_BITS - k) for k in range(1, SOBOL_BITS + 1)]
+    m = [1]
+    for _ in range(SOBOL_BITS - 1):
+        m.append((m[-1] << 1) ^ m[-1])
+    second = [m[k - 1] << (SOBOL_BITS - k) for k in range(1, SOBOL_BITS + 1)]
+    return np.array([first, second], dtype=np.int64)
+
+
+def sobol(walls, n, rng):
+    width, height = walls.shape
+    directions = sobol_directions()
+    shift = rng.randint(2 ** SOBOL_BITS, size=2)  # a random digital shift keeps the sequence low discrepancy
+
+    def candidates(rng, size, start):
+        indices = start + np.arange(size)
+        points = np.zeros((size, 2), dtype=np.int64)
+        for bit in range(SOBOL_BITS):
+            points ^= ((indices >> bit) & 1)[:, None] * directions[:, bit]
+        unit = (points ^ shift) / float(2 ** SOBOL_BITS)
+        return 1 + unit * (width - 2, height - 2)
+
+    return rejection(walls, n, rng, candidates)
+
+
+def gaussian(walls, n, rng):
+    def candidates(rng, size, start):
+        first = box(walls, rng, size)
+        second = first + rng.normal(0, GAUSSIAN_SIGMA, size=(size, 2))
+        first_wall, second_wall = in_wall(walls, first), in_wall(walls, second)
+        # the free point of the pairs with one point in a wall, the others are dropped as if they were in a wall
+        return np.where((first_wall & ~second_wall)[:, None], second,
+                        np.where((second_wall & ~first_wall)[:, None], first, -1))
+
+    return rejection(walls, n, rng, candidates)
+
+
+def bridge(walls, n, rng):
+    def candidates(rng, size, start):
+        first = box(walls, rng, size)
+        second = first + rng.normal(0, BRIDGE_SIGMA, size=(size, 2))
+        middle = (first + second) / 2
+        return np.where((in_wall(walls, first) & in_wall(walls, second))[:, None], middle, -1)
+
+    return rejection(walls, n, rng, candidates)
+
+
+SAMPLERS = {
+    'free': free,
+    'halton': halton,
+    'sobol': sobol,
+    'gaussian': gaussian,
+    'bridge': bridge,
+}